@@ -1,13 +1,16 @@
 import re
 import sys
 import arxiv
+from datetime import datetime
 from omegaconf import OmegaConf
+from typing import Union, List, Optional
 
-from nora.utils.venues import parse_venue
+from nora.utils.venues import VenueMatcher, get_venue_matcher, parse_venue
 from nora.parsers.notion import NotionLibrary
+from nora.utils.arxiv_index import get_arxiv_index
 
 
-__all__ = ['ArxivItem']
+__all__ = ['ArxivItem', 'ArxivBatch', 'parse_arxiv_id']
 
 
 # Documentation: http://lukasschwab.me/arxiv.py/index.html
@@ -17,6 +20,64 @@ __all__ = ['ArxivItem']
 # the maximum request frequency explicitly required by arxiv
 CLIENT = arxiv.Client(page_size=100, delay_seconds=3, num_retries=3)
 
+# Identifiers of the papers published after March 2007: YYMM.NNNNN,
+# with an optional version suffix
+ARXIV_ID = re.compile(r'(\d{4})\.(\d{1,5})(v\d+)?')
+
+
+def parse_arxiv_id(arxiv_id: str) -> Optional[str]:
+    """Parse an arxiv identifier, or arxiv url, into a YYMM.NNNNN
+    identifier, keeping its version suffix if any. Return None if the
+    identifier does not follow the format of articles published after
+    March 2007.
+    """
+    # Drop the query string, the '.pdf' extension of pdf urls and the
+    # path of urls, eg https://arxiv.org/pdf/2306.08045v2.pdf?x=1
+    arxiv_id = re.split(r'[?#]', str(arxiv_id).strip())[0].rstrip('/')
+    arxiv_id = re.sub(r'\.pdf$', '', arxiv_id, flags=re.IGNORECASE)
+    arxiv_id = arxiv_id.split('/')[-1]
+    arxiv_id = re.sub(r'^arxiv:', '', arxiv_id, flags=re.IGNORECASE)
+
+    # Identifiers before March 2007 do not follow the YYMM.NNNNN format
+    match = ARXIV_ID.fullmatch(arxiv_id)
+    if match is None:
+        return None
+    yymm, number, version = match.groups()
+
+    # Sometimes trailing 0s are lost in the process. It is possible to
+    # cover these cases as long as the article came out after March
+    # 2007: https://info.arxiv.org/help/arxiv_identifier.html
+    expected_number_size = 5 if int(yymm) >= 1501 else 4
+    number = number.ljust(expected_number_size, '0')
+
+    return f"{yymm}.{number}{version or ''}"
+
+
+def get_index_result(arxiv_id: str) -> Optional[arxiv.Result]:
+    """Look an identifier up in the local arxiv index, if it was built,
+    and return it as an arxiv result. See `nora arxiv-index`.
+    """
+    index = get_arxiv_index()
+    record = None if index is None else index.get(arxiv_id)
+    if record is None:
+        return None
+    dates = [
+        datetime.fromisoformat(record[k]) if record[k] else datetime.min
+        for k in ['published', 'updated']]
+    return arxiv.Result(
+        entry_id=f"http://arxiv.org/abs/{record['id']}"
+                 f"{record['version'] or ''}",
+        published=dates[0],
+        updated=dates[1],
+        title=record['title'],
+        authors=[arxiv.Result.Author(name) for name in record['authors']],
+        summary=record['abstract'],
+        comment=record['comment'],
+        journal_ref=record['journal_ref'],
+        doi=record['doi'],
+        primary_category=(record['categories'] or [''])[0],
+        categories=record['categories'])
+
 
 class ArxivItem:
 
@@ -25,7 +86,8 @@ class ArxivItem:
             arxiv_id: str=None,
             title: str=None,
             max_results: int=10,
-            cfg_venues: OmegaConf=None):
+            cfg_venues: Union[OmegaConf, VenueMatcher]=None,
+            result: arxiv.Result=None):
         """Object to query a paper from arxiv.
 
         :param arxiv_id: str
@@ -35,21 +97,25 @@ class ArxivItem:
             Title - or portion of the title - of the paper. The arxiv
             database will be queried and the top 10 results will be
             returned
+        :param result: arxiv.Result
+            Already fetched arxiv result of the paper, see `ArxivBatch`.
+            No query is made in this case
         """
-        assert arxiv_id is not None or title is not None, \
+        assert arxiv_id is not None or title is not None \
+            or result is not None, \
             "Please provide an arxiv identifier or a paper title"
 
-        self.cfg_venues = cfg_venues
-
-        if arxiv_id is not None:
-            arxiv_id = str(arxiv_id)
+        # Compile the venue matcher once, unless one is already given
+        self.cfg_venues = get_venue_matcher(cfg_venues)
 
-            # Parse arxiv id from a url
-            if 'arxiv.org' in arxiv_id:
-                arxiv_id = arxiv_id.split('arxiv.org/')[-1].replace('.pdf', '')
+        if result is not None:
+            self.id = result.get_short_id() if arxiv_id is None \
+                else arxiv_id
+            self._item = result
+            return
 
-            # Check whether arxiv id format before March 2007
-            if not bool(re.search(r'[0-9]{4}\.[0-9]', arxiv_id)):
+        if arxiv_id is not None:
+            if parse_arxiv_id(arxiv_id) is None:
                 print(
                     f"❌ The arxiv identifier '{arxiv_id}' does not follow the "
                     f"arxiv format defined for articles published after March "
@@ -57,21 +123,16 @@ class ArxivItem:
                     f"pattern are supported. Please refer to:"
                     f"https://info.arxiv.org/help/arxiv_identifier.html")
                 sys.exit(1)
+            arxiv_id = parse_arxiv_id(arxiv_id)
 
-            # Isolate the YYMM.NNNNN sequence
-            arxiv_id = arxiv_id.split('/')[-1]
+            self.id = arxiv_id
 
-            # Sometimes trailing 0s are lost in the process. It is
-            # possible to cover these cases as long as the article
-            # came out after March 2007:
-            # https://info.arxiv.org/help/arxiv_identifier.html
-            yymm, numbervv = arxiv_id.split(':')[-1].split('.')
-            expected_number_size = 5 if int(yymm) >= 1501 else 4
-            if len(numbervv) < expected_number_size:
-                numbervv += '0' * (expected_number_size - len(numbervv))
-                arxiv_id = f"{yymm}.{numbervv}"
+            # Read from the local index first, if any
+            result = get_index_result(arxiv_id)
+            if result is not None:
+                self._item = result
+                return
 
-            self.id = arxiv_id
             results = list(CLIENT.results(arxiv.Search(id_list=[arxiv_id])))
             if len(results) == 0:
                 print(f"❌ Could not find paper with id='{arxiv_id}'")
@@ -138,14 +199,25 @@ class ArxivItem:
     def doi(self):
         return self._item.doi
 
-    def to_notion(self, cfg: OmegaConf, verbose: bool=True):
+    def to_notion(
+            self,
+            cfg: OmegaConf,
+            verbose: bool=True,
+            notion: NotionLibrary=None):
         """Move paper and authors to Notion. Takes a few seconds...
+
+        :param notion: NotionLibrary
+            Optional NotionLibrary to upload with. Passing the same
+            library across calls allows reusing its cache of already
+            looked-up pages
         """
         if verbose:
             print(f"⬆️ Uploading '{self.title}'...")
 
+        notion = NotionLibrary(cfg) if notion is None else notion
+
         # First, create the paper and its properties
-        response = NotionLibrary(cfg).create_paper(
+        response = notion.create_paper(
             self.title,
             authors=self.authors,
             topics=[],
@@ -155,10 +227,16 @@ class ArxivItem:
             year=self.year,
             venue=self.venue)
 
+        if response is not None and not response.ok:
+            print(
+                f"❌ Notion refused '{self.title}' "
+                f"({response.status_code}): {response.text}")
+            return
+
         # Second, create the blocks (free text) from the notes
         if response is not None and self.notes is not None:
             paper_id = response.json()['id']
-            NotionLibrary(cfg).append_page_blocks(paper_id, self.notes)
+            notion.append_page_blocks(paper_id, self.notes)
 
         if verbose:
             print('✅ Done')
@@ -168,3 +246,111 @@ class ArxivItem:
             f"{key}={getattr(self, key)}"
             for key in ['id', 'title', 'authors']]
         return f"{self.__class__.__name__}({', '.join(info)})"
+
+
+class ArxivBatch:
+
+    """Fetch many papers from arxiv at once. Identifiers are collected
+    with `add`, then `fetch` queries them by chunks of `chunk_size`
+    per request, instead of one request per paper. Since arxiv asks for
+    at most 1 request every 3 seconds, this is much faster for large
+    numbers of papers. Papers found in the local arxiv index are not
+    queried at all.
+
+    :param cfg_venues: OmegaConf or VenueMatcher
+        Venue matcher passed to the returned ArxivItems
+    :param chunk_size: int
+        Number of identifiers queried per request
+    """
+
+    def __init__(
+            self,
+            cfg_venues: Union[OmegaConf, VenueMatcher]=None,
+            chunk_size: int=100):
+        self.cfg_venues = get_venue_matcher(cfg_venues)
+        self.chunk_size = chunk_size
+        self._pending = []
+        self._results = {}
+
+    def add(self, arxiv_id: str):
+        """Schedule an identifier, or arxiv url, for the next `fetch`.
+        Invalid identifiers are ignored.
+        """
+        arxiv_id = parse_arxiv_id(arxiv_id)
+        if arxiv_id is not None and arxiv_id not in self._results:
+            self._pending.append(arxiv_id)
+            self._results[arxiv_id] = None
+
+    def fetch(self, verbose: bool=False):
+        pending = list(dict.fromkeys(self._pending))
+        self._pending = []
+
+        # Read from the local index first, if any, and only query arxiv
+        # for the missing papers
+        if get_arxiv_index() is not None:
+            missing = []
+            for arxiv_id in pending:
+                result = get_index_result(arxiv_id)
+                if result is None:
+                    missing.append(arxiv_id)
+                else:
+                    self._results[arxiv_id] = result
+            pending = missing
+
+        for i in range(0, len(pending), self.chunk_size):
+            chunk = pending[i:i + self.chunk_size]
+            if verbose:
+                print(
+                    f"Fetching arxiv papers {i + 1}-{i + len(chunk)} of "
+                    f"{len(pending)}...")
+            results = self._query(chunk)
+
+            # Unversioned identifiers are returned in their latest
+            # version
+            for result in results:
+                short_id = result.get_short_id()
+                for key in [short_id, re.sub(r'v\d+$', '', short_id)]:
+                    if key in self._results:
+                        self._results[key] = result
+
+    def _query(self, chunk: List[str]) -> List[arxiv.Result]:
+        """Query arxiv for a chunk of identifiers. A single malformed or
+        withdrawn identifier makes arxiv reject the whole query, so a
+        rejected chunk is queried again in halves, until only the bad
+        identifiers are dropped.
+        """
+        search = arxiv.Search(id_list=chunk, max_results=len(chunk))
+        try:
+            return list(CLIENT.results(search))
+        except arxiv.ArxivError as e:
+            # Splitting does not help when arxiv itself is failing
+            server_error = isinstance(e, arxiv.HTTPError) \
+                and (e.status >= 500 or e.status == 429)
+            if len(chunk) == 1 or server_error:
+                print(f"⚠️ Could not fetch arxiv papers {chunk}: {e}")
+                return []
+            half = len(chunk) // 2
+            return self._query(chunk[:half]) + self._query(chunk[half:])
+
+    def get(self, arxiv_id: str) -> Optional[ArxivItem]:
+        """Return the ArxivItem of a fetched identifier, or None if it
+        could not be found.
+        """
+        result = self._results.get(parse_arxiv_id(arxiv_id))
+        if result is None:
+            return None
+        return ArxivItem(
+            parse_arxiv_id(arxiv_id),
+            cfg_venues=self.cfg_venues,
+            result=result)
+
+    def __contains__(self, arxiv_id: str):
+        """Whether the identifier was scheduled for fetching.
+        """
+        return parse_arxiv_id(arxiv_id) in self._results
+
+    def __len__(self):
+        return len(self._results)
+
+    def __repr__(self):
+        return f"{self.__class__.__name__}({len(self)})"
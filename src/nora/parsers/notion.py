@@ -1,13 +1,18 @@
+import asyncio
+import threading
+import unicodedata
 import requests
-import mistletoe
-from notional.parser import HtmlParser
+from collections import OrderedDict
 from omegaconf import OmegaConf
 from typing import List, Dict
 
 from nora.utils.keys import sanity_check_config
+from nora.utils.mirror import NotionMirror
+from nora.utils.notion_blocks import markdown_to_blocks
+from nora.utils.transport import get_notion_transport
 
 
-__all__ = ['NotionLibrary']
+__all__ = ['NotionLibrary', 'AsyncNotionLibrary']
 
 
 class NotionLibrary:
@@ -40,21 +45,248 @@ class NotionLibrary:
             "Notion-Version": "2022-06-28",
             "content-type": "application/json"}
 
+        # All NotionLibrary instances share the same pooled connections
+        self.transport = get_notion_transport(
+            pool_size=self.cfg.get('pool_size', 10),
+            timeout=self.cfg.get('timeout', 30),
+            rate_limit=self.cfg.get('rate_limit', 3),
+            max_retries=self.cfg.get('max_retries', 5))
+
+        # Bounded LRU cache mapping (database id, normalized name) to
+        # page id. Filled by name lookups and by the pages we create, so
+        # that recurring authors, venues, topics, etc. are only queried
+        # once
+        self.cache_size = self.cfg.get('cache_size', 10000)
+        self._page_ids = OrderedDict()
+
+        # Complete in-memory index of page names for the databases
+        # loaded with `prefetch()`. Lookups in these databases never
+        # query Notion
+        self._index = {}
+        self.lookups_avoided = 0
+
+        # Unbounded mapping of the entities resolved upfront with
+        # `resolve_entities()`, never evicted
+        self._pinned = {}
+
+        # Guard the above against concurrent use from several threads,
+        # see AsyncNotionLibrary. Per-name locks ensure two threads
+        # never create the same entity twice
+        self._lock = threading.RLock()
+        self._name_locks = {}
+
+        # Optional local SQLite mirror of the databases, refreshed with
+        # the pages edited since the last sync
+        self.mirror = None
+        if self.cfg.get('mirror', False):
+            self.mirror = NotionMirror()
+            self.sync_mirror()
+
+    @property
+    def database_ids(self):
+        return [
+            self.cfg.papers_db_id,
+            self.cfg.people_db_id,
+            self.cfg.affiliations_db_id,
+            self.cfg.venues_db_id,
+            self.cfg.topics_db_id]
+
+    @staticmethod
+    def _normalize_name(name: str):
+        """Normalize a page name for use as a cache key.
+        """
+        return ' '.join(unicodedata.normalize('NFC', name).split())
+
+    @staticmethod
+    def _get_title(properties: Dict):
+        """Recover the title of a page from its properties, be it a
+        page returned by the Notion API or a payload we built.
+        """
+        for prop in properties.values():
+            if not isinstance(prop, dict) or 'title' not in prop:
+                continue
+            return ''.join(
+                x.get('plain_text', x.get('text', {}).get('content', ''))
+                for x in prop['title'])
+        return None
+
+    def _cache_page_id(self, database_id: str, name: str, page_id: str):
+        with self._lock:
+            if database_id in self._index:
+                self._index[database_id][self._normalize_name(name)] = \
+                    page_id
+                return
+
+            key = (database_id, self._normalize_name(name))
+            self._page_ids[key] = page_id
+            self._page_ids.move_to_end(key)
+            while len(self._page_ids) > self.cache_size:
+                self._page_ids.popitem(last=False)
+
+    def _get_cached_page_id(self, database_id: str, name: str):
+        """Look a page up in the prefetched index and the cache. Return
+        a (found, page_id) tuple.
+        """
+        with self._lock:
+            key = (database_id, self._normalize_name(name))
+            if key in self._pinned:
+                return True, self._pinned[key]
+
+            if database_id in self._index:
+                self.lookups_avoided += 1
+                index = self._index[database_id]
+                return True, index.get(self._normalize_name(name))
+
+            if key in self._page_ids:
+                self._page_ids.move_to_end(key)
+                return True, self._page_ids[key]
+
+        return False, None
+
+    def _get_page_id(self, database_id: str, name: str):
+        """Get the id of the page named `name` in a database, or None
+        if no such page exists. Found ids are cached, so subsequent
+        lookups for the same name do not query Notion.
+        """
+        found, page_id = self._get_cached_page_id(database_id, name)
+        if found:
+            return page_id
+
+        key = (database_id, self._normalize_name(name))
+
+        if self.mirror is not None and self.mirror.is_synced(database_id):
+            page_id = self.mirror.get_page_id(*key)
+            if page_id is not None:
+                self._cache_page_id(database_id, name, page_id)
+            return page_id
+
+        pages = self._get_pages(database_id, num=1, name_equals=name)
+        if len(pages) == 0:
+            return None
+        self._cache_page_id(database_id, name, pages[0]['id'])
+        return pages[0]['id']
+
+    def _resolve_page_id(self, database_id: str, name: str, create):
+        """Get the id of the page named `name` in a database, creating
+        the page with `create(name)` if it does not exist. Concurrent
+        calls for the same name are serialized, so the page is only
+        created once.
+        """
+        key = (database_id, self._normalize_name(name))
+        with self._lock:
+            lock = self._name_locks.setdefault(key, threading.Lock())
+
+        with lock:
+            page_id = self._get_page_id(database_id, name)
+            if page_id is None:
+                create(name)
+                page_id = self._get_page_id(database_id, name)
+            return page_id
+
+    def resolve_entities(
+            self,
+            people: List[str]=(),
+            venues: List[str]=(),
+            topics: List[str]=()):
+        """Resolve each of the given people, venues and topics once,
+        creating those missing from Notion. Their page ids are kept in
+        memory for the lifetime of the library, so that creating papers
+        referring to them requires no further lookup.
+        """
+        groups = [
+            (self.cfg.people_db_id, people, self.create_person),
+            (self.cfg.venues_db_id, venues, self.create_venue),
+            (self.cfg.topics_db_id, topics, self.create_topic)]
+        for database_id, names, create in groups:
+            for name in dict.fromkeys(names):
+                name = name[:self.cfg.max_text_length]
+                page_id = self._resolve_page_id(database_id, name, create)
+                if page_id is None:
+                    continue
+                with self._lock:
+                    key = (database_id, self._normalize_name(name))
+                    self._pinned[key] = page_id
+
+    def _page_to_row(self, database_id: str, page: Dict):
+        """Convert a page returned by the Notion API into a row of the
+        local mirror.
+        """
+        name = self._get_title(page['properties'])
+        url = next((
+            x['url'] for x in page['properties'].values()
+            if isinstance(x, dict) and x.get('type') == 'url'), None)
+        year = page['properties'].get(self.cfg.paper_keys['year'], {})
+        return {
+            'page_id': page['id'],
+            'database_id': database_id,
+            'name': name,
+            'norm_name': None if name is None else self._normalize_name(name),
+            'url': url,
+            'year': year.get('number'),
+            'last_edited_time': page.get('last_edited_time')}
+
+    def sync_mirror(self, full: bool=False):
+        """Refresh the local mirror with the pages edited since the
+        last sync of each database. Pages deleted or archived in Notion
+        are only removed from the mirror with a `full` refresh.
+        """
+        for database_id in self.database_ids:
+            if full:
+                self.mirror.clear(database_id)
+            since = self.mirror.last_sync(database_id)
+            pages = self._get_pages(database_id, edited_after=since)
+            self.mirror.upsert([
+                self._page_to_row(database_id, page) for page in pages])
+
+            # Notion rounds `last_edited_time` to the minute, so pages
+            # edited at the time of the last sync will be pulled again,
+            # which is harmless
+            times = [p['last_edited_time'] for p in pages] + [since or '']
+            self.mirror.set_last_sync(database_id, max(times) or None)
+
+    def prefetch(self, database_ids: List[str]=None):
+        """Read whole databases once and index the names of their pages
+        in memory. Name lookups in these databases are then resolved
+        from the index, without querying Notion. By default, the people,
+        affiliations, venues and topics databases are prefetched.
+        """
+        if database_ids is None:
+            database_ids = [
+                self.cfg.people_db_id,
+                self.cfg.affiliations_db_id,
+                self.cfg.venues_db_id,
+                self.cfg.topics_db_id]
+
+        for database_id in database_ids:
+            index = {}
+            for page in self._get_pages(database_id):
+                name = self._get_title(page['properties'])
+                if name is not None:
+                    index.setdefault(self._normalize_name(name), page['id'])
+            with self._lock:
+                self._index[database_id] = index
+
     def retrieve_page_from_id(self, page_id: str):
-        """Directly retrieve a page from its id.
+        """Directly retrieve a page from its id. Return None if there
+        is no such page.
         """
         url = f"https://api.notion.com/v1/pages/{page_id}"
-        response = requests.get(url, headers=self.headers)
-        if response.text['object'] != 'error':
-            return response.json()
+        response = self.transport.get(
+            url, headers=self.headers)
+        if response.status_code == 404:
+            return None
+        return self._json(response, f"retrieve the page {page_id}")
 
     def _get_pages(
             self,
             database_id: str,
             num: int=None,
             name_equals: str=None,
-            name_contains: str=None):
-        """Get pages from your Notion database.
+            name_contains: str=None,
+            edited_after: str=None):
+        """Get pages from your Notion database. Pages may be filtered by
+        name or to those edited on or after the `edited_after` ISO 8601
+        timestamp.
 
         credits: https://www.python-engineer.com/posts/notion-api-python
         """
@@ -76,16 +308,24 @@ class NotionLibrary:
                 "property": "Name",
                 "rich_text": {
                     "contains": name_contains}}
-        response = requests.post(url, json=payload, headers=self.headers)
-        data = response.json()
+        elif edited_after:
+            payload['filter'] = {
+                "timestamp": "last_edited_time",
+                "last_edited_time": {
+                    "on_or_after": edited_after}}
+        # Queries do not modify the database, so they may be retried
+        response = self.transport.post(
+            url, json=payload, headers=self.headers, idempotent=True)
+        data = self._json(response, f"query the database {database_id}")
         results = data["results"]
 
         # If more is needed, read other chunks of 'num' pages
         while data["has_more"] and get_all:
             payload["start_cursor"] = data["next_cursor"]
-            response = requests.post(
-                url, json=payload, headers=self.headers)
-            data = response.json()
+            response = self.transport.post(
+                url, json=payload, headers=self.headers, idempotent=True)
+            data = self._json(
+                response, f"query the database {database_id}")
             results.extend(data["results"])
 
         return results
@@ -117,13 +357,37 @@ class NotionLibrary:
 
     def get_page_blocks(self, page_id: str):
         url = f"https://api.notion.com/v1/blocks/{page_id}/children?page_size="
-        response = requests.get(url, headers=self.headers)
-        return response.json()["results"]
+        response = self.transport.get(
+            url, headers=self.headers)
+        return self._json(response, f"read the blocks of {page_id}")["results"]
+
+    @staticmethod
+    def _json(response: requests.Response, action: str) -> Dict:
+        """Decode a response of the Notion API. Raise a clear error if
+        the request failed, eg if still rate-limited after all retries.
+        """
+        if not response.ok:
+            raise requests.HTTPError(
+                f"❌ Notion failed to {action} ({response.status_code}): "
+                f"{response.text}",
+                response=response)
+        return response.json()
 
     def _create_page(self, database_id: str, data: dict):
         url = "https://api.notion.com/v1/pages"
         payload = {'parent': {'database_id': database_id}, 'properties': data}
-        response = requests.post(url, headers=self.headers, json=payload)
+        response = self.transport.post(
+            url, headers=self.headers, json=payload)
+
+        # Remember the id of the created page, so we never need to query
+        # for it
+        name = self._get_title(data)
+        if response.ok and name is not None:
+            self._cache_page_id(database_id, name, response.json()['id'])
+        if response.ok and self.mirror is not None:
+            self.mirror.upsert([
+                self._page_to_row(database_id, response.json())])
+
         return response
 
     def create_person(
@@ -134,7 +398,7 @@ class NotionLibrary:
             website: str=None):
         # Skip if person already exists in the database
         name = name[:self.cfg.max_text_length]
-        if len(self.get_people(name_equals=name)) > 0:
+        if self._get_page_id(self.cfg.people_db_id, name) is not None:
             print(f"ℹ️  Person '{name}' already exists")
             return
 
@@ -145,22 +409,19 @@ class NotionLibrary:
         # Papers
         paper_ids = []
         for paper in papers:
-            item = self.get_papers(name_equals=paper)
-            if len(item) == 0:
-                self.create_paper(paper)
-                item = self.get_papers(name_equals=paper)
-            paper_ids.append(item[0]['id'])
+            paper_id = self._resolve_page_id(
+                self.cfg.papers_db_id, paper, self.create_paper)
+            paper_ids.append(paper_id)
         data[self.cfg.person_keys['papers']] = {
             'relation': [{'id': x} for x in paper_ids]}
 
         # Affiliations
         affiliation_ids = []
         for affiliation in affiliations:
-            item = self.get_affiliations(name_equals=affiliation)
-            if len(item) == 0:
-                self.create_affiliation(affiliation)
-                item = self.get_affiliations(name_equals=affiliation)
-            affiliation_ids.append(item[0]['id'])
+            affiliation_id = self._resolve_page_id(
+                self.cfg.affiliations_db_id, affiliation,
+                self.create_affiliation)
+            affiliation_ids.append(affiliation_id)
         data[self.cfg.person_keys['affiliations']] = {
             'relation': [{'id': x} for x in affiliation_ids]}
 
@@ -184,7 +445,7 @@ class NotionLibrary:
 
         # Skip if paper already exists in the database
         name = name[:self.cfg.max_text_length]
-        if len(self.get_papers(name_equals=name)) > 0:
+        if self._get_page_id(self.cfg.papers_db_id, name) is not None:
             print(f"ℹ️  Paper '{name}' already exists")
             return
 
@@ -196,11 +457,9 @@ class NotionLibrary:
         author_ids = []
         for author in authors:
             author = author[:self.cfg.max_text_length]
-            item = self.get_people(name_equals=author)
-            if len(item) == 0:
-                self.create_person(author)
-                item = self.get_people(name_equals=author)
-            author_ids.append(item[0]['id'])
+            author_id = self._resolve_page_id(
+                self.cfg.people_db_id, author, self.create_person)
+            author_ids.append(author_id)
         data[self.cfg.paper_keys['authors']] = {
             'relation': [{'id': x} for x in author_ids]}
 
@@ -208,11 +467,9 @@ class NotionLibrary:
         topic_ids = []
         for topic in topics:
             topic = topic[:self.cfg.max_text_length]
-            item = self.get_topics(name_equals=topic)
-            if len(item) == 0:
-                self.create_topic(topic)
-                item = self.get_topics(name_equals=topic)
-            topic_ids.append(item[0]['id'])
+            topic_id = self._resolve_page_id(
+                self.cfg.topics_db_id, topic, self.create_topic)
+            topic_ids.append(topic_id)
         data[self.cfg.paper_keys['topics']] = {
             'relation': [{'id': x} for x in topic_ids]}
 
@@ -240,11 +497,8 @@ class NotionLibrary:
         # Venue
         if venue is not None:
             venue = venue[:self.cfg.max_text_length]
-            item = self.get_venues(name_equals=venue)
-            if len(item) == 0:
-                self.create_venue(venue)
-                item = self.get_venues(name_equals=venue)
-            venue_id = item[0]['id']
+            venue_id = self._resolve_page_id(
+                self.cfg.venues_db_id, venue, self.create_venue)
             data[self.cfg.paper_keys['venue']] = {
                 'relation': [{'id': venue_id}]}
 
@@ -253,7 +507,7 @@ class NotionLibrary:
     def create_affiliation(self, name: str):
         # Skip if affiliation already exists in the database
         name = name[:self.cfg.max_text_length]
-        if len(self.get_affiliations(name_equals=name)) > 0:
+        if self._get_page_id(self.cfg.affiliations_db_id, name) is not None:
             print(f"ℹ️  Affiliation '{name}' already exists")
             return
 
@@ -267,7 +521,7 @@ class NotionLibrary:
     def create_venue(self, name: str):
         # Skip if venue already exists in the database
         name = name[:self.cfg.max_text_length]
-        if len(self.get_venues(name_equals=name)) > 0:
+        if self._get_page_id(self.cfg.venues_db_id, name) is not None:
             print(f"ℹ️  Venue '{name}' already exists")
             return
 
@@ -281,7 +535,7 @@ class NotionLibrary:
     def create_topic(self, name: str):
         # Skip if venue already exists in the database
         name = name[:self.cfg.max_text_length]
-        if len(self.get_topics(name_equals=name)) > 0:
+        if self._get_page_id(self.cfg.topics_db_id, name) is not None:
             print(f"ℹ️  Topic '{name}' already exists")
             return
 
@@ -293,99 +547,116 @@ class NotionLibrary:
         return self._create_page(self.cfg.topics_db_id, data)
 
     def append_page_blocks(self, page_id: str, text: str):
-        # Convert input HTML text to Notion API json
-        html_text = mistletoe.markdown(text)
-        parser = HtmlParser()
-        parser.parse(html_text)
-        notion_text = [x.dict() for x in parser.content]
-
-        # The Notion API only supports a limited depth for nested items
-        # This can cause errors if we have overly-deep bullet lists, for
-        # instance. So we flatten all the text beyond a certain depth
-        notion_text = self._flatten_max_depth_children(
-            notion_text, max_depth=2, marker='•')
+        # Convert input Markdown text to Notion API json. The Notion API
+        # only supports a limited depth for nested items, this can cause
+        # errors if we have overly-deep bullet lists, for instance. So
+        # we flatten all the text beyond a certain depth
+        notion_text = markdown_to_blocks(text, max_depth=2, marker='•')
 
         # Append text to page blocks
         url = f"https://api.notion.com/v1/blocks/{page_id}/children"
         payload = {'children': notion_text}
-        response = requests.patch(url, json=payload, headers=self.headers)
+        response = self.transport.patch(
+            url, json=payload, headers=self.headers)
         return response
 
     def _update_page(self, page_id: str, data: dict):
         url = f"https://api.notion.com/v1/pages/{page_id}"
         payload = {"properties": data}
-        response = requests.patch(url, json=payload, headers=self.headers)
+        response = self.transport.patch(
+            url, json=payload, headers=self.headers)
         return response
 
-    def _flatten_block(
+    def __repr__(self):
+        info = [
+            f"{key}={len(getattr(self, key))}"
+            for key in ['papers', 'people', 'affiliations', 'venues']]
+        return f"{self.__class__.__name__}({', '.join(info)})"
+
+
+class AsyncNotionLibrary:
+
+    """asyncio counterpart of NotionLibrary, exposing the same methods
+    as coroutines. Each call runs the corresponding NotionLibrary method
+    in a worker thread, so that up to `concurrency` calls may wait on
+    the network at once. All calls share the rate-limited transport of
+    NotionLibrary, so the overall request rate is still capped.
+    """
+
+    def __init__(
             self,
-            block: Dict,
-            marker: str='•',
-            depth: int=1):
-        text = ' '.join(
-            [x['text']['content'] for x in block[block['type']]['rich_text']])
+            cfg: OmegaConf,
+            concurrency: int=8,
+            library: NotionLibrary=None):
+        self.library = NotionLibrary(cfg) if library is None else library
+        self.cfg = self.library.cfg
+        self.concurrency = concurrency
+        self._semaphore = None
 
-        if not block['has_children']:
-            return text
+    async def _run(self, method, *args, **kwargs):
+        # The semaphore is created lazily, to be bound to the running
+        # event loop
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.concurrency)
+        async with self._semaphore:
+            return await asyncio.to_thread(method, *args, **kwargs)
 
-        text += " ( "
+    @property
+    def lookups_avoided(self):
+        return self.library.lookups_avoided
 
-        for child in block[block['type']]['children']:
-            flat_child = self._flatten_block(
-                child, marker=marker, depth=depth + 1)
-            text += f" {marker * depth} {flat_child}"
+    async def prefetch(self, *args, **kwargs):
+        return await self._run(self.library.prefetch, *args, **kwargs)
 
-        text += " ) "
+    async def sync_mirror(self, *args, **kwargs):
+        return await self._run(self.library.sync_mirror, *args, **kwargs)
 
-        return text
+    async def resolve_entities(self, *args, **kwargs):
+        return await self._run(
+            self.library.resolve_entities, *args, **kwargs)
 
-    def _flatten_children(
-            self,
-            block: Dict,
-            marker: str='•',
-            depth: int=1):
-        if not block['has_children']:
-            return block
-
-        # Recursively flatten and wrap the content of descendent blocks
-        text = " ( "
-        for child in block[block['type']]['children']:
-            flat_child = self._flatten_block(
-                child, marker=marker, depth=depth + 1)
-            text += f" {marker * depth} {flat_child}"
-        text += " ) "
-
-        # Create a new text block containing the flattened children text
-        block[block['type']]['rich_text'].append(
-            {'type': 'text', 'text': {'content': text}})
-        block['has_children'] = False
-        del block[block['type']]['children']
-
-        return block
-
-    def _flatten_max_depth_children(
-            self,
-            blocks: List[Dict],
-            depth: int=0,
-            max_depth: int=2,
-            marker: str='•'):
-        for i, block in enumerate(blocks):
-            if not block['has_children']:
-                continue
+    async def retrieve_page_from_id(self, *args, **kwargs):
+        return await self._run(
+            self.library.retrieve_page_from_id, *args, **kwargs)
 
-            if depth >= max_depth:
-                blocks[i] = self._flatten_children(
-                    block, marker=marker)
-                continue
+    async def get_people(self, *args, **kwargs):
+        return await self._run(self.library.get_people, *args, **kwargs)
+
+    async def get_papers(self, *args, **kwargs):
+        return await self._run(self.library.get_papers, *args, **kwargs)
+
+    async def get_affiliations(self, *args, **kwargs):
+        return await self._run(
+            self.library.get_affiliations, *args, **kwargs)
+
+    async def get_venues(self, *args, **kwargs):
+        return await self._run(self.library.get_venues, *args, **kwargs)
 
-            self._flatten_max_depth_children(
-                block[block['type']]['children'], depth=depth + 1,
-                max_depth=max_depth, marker=marker)
+    async def get_topics(self, *args, **kwargs):
+        return await self._run(self.library.get_topics, *args, **kwargs)
 
-        return blocks
+    async def get_page_blocks(self, *args, **kwargs):
+        return await self._run(self.library.get_page_blocks, *args, **kwargs)
+
+    async def create_person(self, *args, **kwargs):
+        return await self._run(self.library.create_person, *args, **kwargs)
+
+    async def create_paper(self, *args, **kwargs):
+        return await self._run(self.library.create_paper, *args, **kwargs)
+
+    async def create_affiliation(self, *args, **kwargs):
+        return await self._run(
+            self.library.create_affiliation, *args, **kwargs)
+
+    async def create_venue(self, *args, **kwargs):
+        return await self._run(self.library.create_venue, *args, **kwargs)
+
+    async def create_topic(self, *args, **kwargs):
+        return await self._run(self.library.create_topic, *args, **kwargs)
+
+    async def append_page_blocks(self, *args, **kwargs):
+        return await self._run(
+            self.library.append_page_blocks, *args, **kwargs)
 
     def __repr__(self):
-        info = [
-            f"{key}={len(getattr(self, key))}"
-            for key in ['papers', 'people', 'affiliations', 'venues']]
-        return f"{self.__class__.__name__}({', '.join(info)})"
+        return f"{self.__class__.__name__}(concurrency={self.concurrency})"
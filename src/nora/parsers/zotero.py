@@ -1,18 +1,30 @@
+import queue
+import asyncio
 import datetime
+import threading
+from pathlib import Path
+from itertools import islice
+from functools import cached_property
 
 from pyzotero import zotero
 from omegaconf import OmegaConf
-from typing import List, Dict
+from typing import List, Dict, Union, Iterable, Iterator
 
-from nora.utils.venues import parse_venue
-from nora.parsers.arxiv import ArxivItem
-from nora.parsers.notion import NotionLibrary
+from nora.utils.venues import VenueMatcher, get_venue_matcher, parse_venue
+from nora.parsers.arxiv import ArxivBatch
+from nora.parsers.notion import NotionLibrary, AsyncNotionLibrary
 from nora.utils.translation_server import *
 from nora.utils.zotero import *
 from nora.utils.keys import sanity_check_config
+from nora.utils.journal import MigrationJournal
+from nora.utils.snapshot import ZoteroSnapshot
+from nora.utils.zotero_db import ZoteroDatabase
+from nora.utils.bibliography import iter_bibliography
+from nora.utils.dedup import DuplicateIndex
 
 
-__all__ = ['ZoteroLibrary', 'ZoteroItem']
+__all__ = [
+    'ZoteroLibrary', 'ZoteroStream', 'BibliographyStream', 'ZoteroItem']
 
 
 class ZoteroLibrary:
@@ -20,19 +32,33 @@ class ZoteroLibrary:
     def __init__(
             self,
             cfg: OmegaConf,
-            cfg_venues: OmegaConf=None,
+            cfg_venues: Union[OmegaConf, VenueMatcher]=None,
             verbose: bool=False):
-        keys = ['library_id', 'api_token']
-        users_keys = [f"zotero_{k}" for k in keys]
-        sanity_check_config(cfg, keys, users_keys)
+        # The local Zotero database does not require any API key
+        if not cfg.get('database'):
+            keys = ['library_id', 'api_token']
+            users_keys = [f"zotero_{k}" for k in keys]
+            sanity_check_config(cfg, keys, users_keys)
 
         self.cfg = cfg
-        self.cfg_venues = cfg_venues
         self.verbose = verbose
         self.library = None
         self.items = None
+        self.collections = None
+        self.notes_index = None
+        self.arxiv_batch = None
         self.ignored = []
 
+        # ZoteroItems already built, by item key
+        self._zitems = {}
+
+        # Keys of the items whose venues were resolved, see
+        # `prepare_venues`
+        self._prepared = set()
+
+        # Compile the venue matcher once for all items
+        self.cfg_venues = get_venue_matcher(cfg_venues)
+
         # Read ALL the library, may take a few seconds...
         self.load()
 
@@ -44,87 +70,489 @@ class ZoteroLibrary:
     def load(self):
         """Connect to the Zotero library and read ALL OF IT. May take a
         few seconds.
+
+        Unless `snapshot` is disabled in the config, the library is
+        kept in a local snapshot, and only the items changed since the
+        previous run are downloaded.
+
+        If `database` is set in the config, the library is read from
+        the database of the Zotero desktop client instead, without any
+        network call.
         """
         if self.verbose:
             print("Loading items...")
 
+        if self.cfg.get('database'):
+            database = ZoteroDatabase(self.cfg.database)
+            self.items = database.items
+            collections = database.collections
+            notes = database.notes
+            self.build_indices(collections, notes)
+            return
+
         self.library = zotero.Zotero(
             self.cfg.library_id,
             'user',
             self.cfg.api_token)
 
-        self.items = self.library.everything(self.library.top())
+        if not self.cfg.get('snapshot', True):
+            self.items = self.library.everything(self.library.top())
+            collections = self.library.everything(self.library.collections())
+            notes = self.library.everything(
+                self.library.items(itemType='note'))
+        else:
+            snapshot = ZoteroSnapshot(self.library)
+            snapshot.refresh(verbose=self.verbose)
+            self.items = list(snapshot.items.values())
+            collections = list(snapshot.collections.values())
+            notes = list(snapshot.notes.values())
+
+        self.build_indices(collections, notes)
+
+    def build_indices(self, collections: List[Dict], notes: List[Dict]):
+        # Resolve the ancestors of all collections and group the notes
+        # by parent item at once, so items can recover their topics and
+        # notes without querying Zotero
+        self.collections = self.build_collection_ancestors(collections)
+        self.notes_index = self.build_notes_index(notes)
+
+    @staticmethod
+    def build_notes_index(notes: List[Dict]):
+        """Map each item key to the content of its child notes, in the
+        order they were added.
+        """
+        notes = sorted(notes, key=lambda x: x['data'].get('dateAdded', ''))
+        index = {}
+        for note in notes:
+            parent_key = note['data'].get('parentItem')
+            if not parent_key:
+                continue
+            index.setdefault(parent_key, []).append(note['data']['note'])
+        return index
+
+    @staticmethod
+    def build_collection_ancestors(collections: List[Dict]):
+        """Map each collection key to the names of the collection and
+        all its ancestors, from the collection itself up to the root.
+        """
+        parents = {
+            c['key']: (c['data']['name'], c['data'].get('parentCollection'))
+            for c in collections}
+        ancestors = {}
+
+        def resolve(key: str, visited: set):
+            if key in ancestors:
+                return ancestors[key]
+            if key not in parents or key in visited:
+                return []
+            visited.add(key)
+            name, parent_key = parents[key]
+            names = [name]
+            if parent_key:
+                names += resolve(parent_key, visited)
+            ancestors[key] = names
+            return names
+
+        for key in parents:
+            resolve(key, set())
+
+        return ancestors
+
+    def _ignore(self, item: Dict, reason: str):
+        self.ignored.append((item, reason))
+
+    def filter_papers(self, items: Iterable[Dict]) -> Iterator[Dict]:
+        """Only yield paper-type items.
+        """
+        for item in items:
+            if item['data']['itemType'] not in ZOTERO_SUPPORTED_TYPES:
+                self._ignore(
+                    item, f"non-paper dtype: {item['data']['itemType']}")
+                continue
+            yield item
+
+    def filter_authors(self, items: Iterable[Dict]) -> Iterator[Dict]:
+        """Only yield papers with at least 1 author.
+        """
+        for item in items:
+            if len(item['data']['creators']) < 1:
+                self._ignore(item, f"no authors")
+                continue
+            yield item
+
+    def filter_duplicates(self, items: Iterable[Dict]) -> Iterator[Dict]:
+        """Only yield the first-encountered item if multiple items share
+        the same DOI, arXiv identifier, ISBN or normalized title.
+        """
+        index = DuplicateIndex()
+        for item in items:
+            key = index.find(item['data'])
+            if key is not None:
+                self._ignore(item, f"duplicate {key[0]}: {key[1]}")
+                continue
+            index.add(item['data'])
+            yield item
+
+    def filter_existing(
+            self,
+            items: Iterable[Dict],
+            index: DuplicateIndex) -> Iterator[Dict]:
+        """Only yield the items not matching a paper of the index, see
+        `get_notion_index()`.
+        """
+        for item in items:
+            key = index.find(item['data'])
+            if key is not None:
+                self._ignore(item, f"in Notion {key[0]}: {key[1]}")
+                continue
+            yield item
 
     def discard_non_paper(self):
         """Only keep paper-type items.
         """
         if self.verbose:
             print("Discarding non-paper items...")
-        ignored = [
-            (item, f"non-paper dtype: {item['data']['itemType']}")
-            for item in self.items
-            if item['data']['itemType'] not in ZOTERO_SUPPORTED_TYPES]
-        self.items = [
-            item for item in self.items
-            if item['data']['itemType'] in ZOTERO_SUPPORTED_TYPES]
-        self.ignored += ignored
+        num_items = len(self.items)
+        self.items = list(self.filter_papers(self.items))
         if self.verbose:
-            print(f"Found {len(ignored)} non-paper items")
+            print(f"Found {num_items - len(self.items)} non-paper items")
 
     def discard_no_authors(self):
         """Only keep papers with at least 1 author.
         """
         if self.verbose:
             print("Discarding items without authors...")
-        ignored = []
-        ignored += [
-            (item, f"no authors")
-            for item in self.items if len(item['data']['creators']) < 1]
-        self.items = [
-            item for item in self.items if len(item['data']['creators']) > 0]
-        self.ignored += ignored
+        num_items = len(self.items)
+        self.items = list(self.filter_authors(self.items))
         if self.verbose:
-            print(f"Found {len(ignored)} items without author")
+            print(f"Found {num_items - len(self.items)} items without author")
 
     def discard_duplicates(self):
-        """Only keep the first-encountered item if multiple items have
-        the same title.
+        """Only keep the first-encountered item if multiple items share
+        the same DOI, arXiv identifier, ISBN or normalized title.
         """
         if self.verbose:
             print("Discarding duplicate items...")
-        ignored = []
-        titles = []
-        keep = []
-        for i, item in enumerate(self.items):
-            title = item['data']['title']
-            if title in titles:
-                ignored.append((item, f"duplicate title: {title}"))
+        num_items = len(self.items)
+        self.items = list(self.filter_duplicates(self.items))
+        if self.verbose:
+            print(f"Found {num_items - len(self.items)} duplicate items")
+
+    @staticmethod
+    def get_notion_index(notion: NotionLibrary) -> DuplicateIndex:
+        """Index the papers already in Notion by DOI, arXiv identifier
+        or normalized title. The papers are read from the local mirror
+        if enabled, from Notion otherwise.
+        """
+        if notion.mirror is not None \
+                and notion.mirror.is_synced(notion.cfg.papers_db_id):
+            papers = [
+                {'title': x['name'], 'url': x['url']}
+                for x in notion.mirror.get_pages(notion.cfg.papers_db_id)]
+        else:
+            papers = [
+                notion._page_to_row(notion.cfg.papers_db_id, page)
+                for page in notion.get_papers()]
+            papers = [{'title': x['name'], 'url': x['url']} for x in papers]
+
+        index = DuplicateIndex()
+        for paper in papers:
+            index.add(paper)
+        return index
+
+    def discard_existing(self, notion: NotionLibrary):
+        """Discard the items matching a paper already in Notion, by
+        DOI, arXiv identifier or normalized title. See
+        `get_notion_index()`.
+        """
+        if self.verbose:
+            print("Discarding items already in Notion...")
+        num_items = len(self.items)
+        self.items = list(self.filter_existing(
+            self.items, self.get_notion_index(notion)))
+        if self.verbose:
+            print(
+                f"Found {num_items - len(self.items)} items already in "
+                f"Notion")
+
+    def resolve_venues(
+            self,
+            workers: int=-1,
+            zitems: List['ZoteroItem']=None):
+        """Match the venue texts of all items in a single batch. The
+        fuzzy fallback of all texts without an exact match is scored at
+        once, on `workers` cores. Results are memoized in the venue
+        matcher, from which items then read their venue.
+
+        :param zitems: List[ZoteroItem]
+            Items whose venues to resolve. Defaults to the whole library
+        """
+        if self.cfg_venues is None:
+            return
+
+        # Items stop searching at their first text with an exact match,
+        # so only texts up to that one may need the fuzzy fallback
+        texts = []
+        for zitem in (self if zitems is None else zitems):
+            for text in zitem.venue_texts():
+                texts.append(text)
+                if self.cfg_venues.match_exact(text.lower()) is not None:
+                    break
+
+        self.cfg_venues.match_many(texts, workers=workers)
+
+    def fetch_arxiv(self, zitems: List['ZoteroItem']=None) -> ArxivBatch:
+        """Fetch from arXiv, in a few batched requests, the papers of
+        all arXiv items whose venue could not be parsed from Zotero.
+        Items then read their venue from these results instead of
+        querying arXiv one by one.
+
+        :param zitems: List[ZoteroItem]
+            Items whose papers to fetch. Defaults to the whole library
+        """
+        batch = ArxivBatch(cfg_venues=self.cfg_venues)
+        for zitem in (self if zitems is None else zitems):
+            zitem.arxiv_batch = batch
+            if not zitem.arxiv:
                 continue
-            titles.append(title)
-            keep.append(i)
-        self.items = [self.items[i] for i in keep]
-        self.ignored += ignored
+            if self.cfg_venues is not None and any(
+                    self.cfg_venues(text) is not None
+                    for text in zitem.venue_texts()):
+                continue
+            batch.add(zitem.arxiv)
+
+        if len(batch) > 0:
+            batch.fetch(verbose=self.verbose)
+        return batch
+
+    def prepare_venues(self, zitems: List['ZoteroItem']=None):
+        """Resolve the venues and fetch the arXiv papers of the given
+        items at once, see `resolve_venues` and `fetch_arxiv`. This is
+        only done when uploading, for the items not prepared yet, so
+        that loading the library does not query arXiv.
+
+        :param zitems: List[ZoteroItem]
+            Items whose venues to prepare. Defaults to the whole library
+        """
+        zitems = [
+            zitem for zitem in (self if zitems is None else zitems)
+            if zitem.key not in self._prepared]
+        if len(zitems) == 0:
+            return
         if self.verbose:
-            print(f"Found {len(ignored)} duplicate items")
+            print("Resolving venues...")
+        self.resolve_venues(zitems=zitems)
+        self.arxiv_batch = self.fetch_arxiv(zitems=zitems)
+        self._prepared.update(zitem.key for zitem in zitems)
 
-    def to_notion(self, cfg: OmegaConf, verbose: bool=True):
+    def to_notion(
+            self,
+            cfg: OmegaConf,
+            verbose: bool=True,
+            prefetch: bool=False,
+            concurrency: int=1,
+            resolve_entities: bool=False,
+            resume: bool=False,
+            skip_existing: bool=False):
         """Move all papers and authors in the Zotero library to Notion.
         This may take a while...
+
+        :param prefetch: bool
+            If True, the people, affiliations, venues and topics Notion
+            databases are read in full before uploading, so that
+            existence checks for these entities do not query Notion
+        :param concurrency: int
+            Number of items uploaded concurrently. If greater than 1,
+            the upload runs with `ato_notion`
+        :param resolve_entities: bool
+            If True, the unique authors, venues and topics of the whole
+            library are resolved, or created, once before uploading any
+            paper. See `resolve_entities()`
+        :param resume: bool
+            If True, items recorded as uploaded in the journal of
+            previous runs are skipped without any network call. See
+            `MigrationJournal`
+        :param skip_existing: bool
+            If True, items matching a paper already in Notion are
+            discarded before any upload work. See `discard_existing()`
+        """
+        if concurrency > 1:
+            return asyncio.run(self.ato_notion(
+                cfg, verbose=verbose, prefetch=prefetch,
+                concurrency=concurrency, resolve_entities=resolve_entities,
+                resume=resume, skip_existing=skip_existing))
+
+        # Share a single NotionLibrary across all items, to benefit from
+        # its cache of already-resolved authors, venues and topics
+        notion = NotionLibrary(cfg)
+        if skip_existing:
+            self.discard_existing(notion)
+
+        journal = self.get_journal(cfg)
+        todo = self._todo(journal if resume else None, verbose=verbose)
+        self.prepare_venues([self[i] for i in todo])
+
+        if prefetch:
+            if verbose:
+                print("Prefetching Notion databases...")
+            notion.prefetch()
+
+        zitems = None
+        if resolve_entities:
+            zitems = {i: self[i] for i in todo}
+            self.resolve_entities(notion, zitems=list(zitems.values()))
+
+        for j, i in enumerate(todo):
+            if verbose:
+                print(f"[{j + 1}/{len(todo)}]", end=' ')
+            zitem = self[i] if zitems is None else zitems[i]
+            zitem.to_notion(
+                cfg, verbose=verbose, notion=notion, journal=journal,
+                resume=resume)
+
+        journal.close()
+
+        if prefetch and verbose:
+            print(
+                f"ℹ️  Prefetching avoided {notion.lookups_avoided} Notion "
+                f"lookups")
+
+    async def ato_notion(
+            self,
+            cfg: OmegaConf,
+            verbose: bool=True,
+            prefetch: bool=False,
+            concurrency: int=8,
+            resolve_entities: bool=False,
+            resume: bool=False,
+            skip_existing: bool=False):
+        """asyncio counterpart of `to_notion`, uploading up to
+        `concurrency` items at once. The Notion rate limit still
+        applies, but the items no longer wait for each other's
+        round trips.
         """
-        for i, zitem in enumerate(self):
+        notion = AsyncNotionLibrary(cfg, concurrency=concurrency)
+        if skip_existing:
+            await asyncio.to_thread(self.discard_existing, notion.library)
+
+        journal = self.get_journal(cfg)
+        todo = self._todo(journal if resume else None, verbose=verbose)
+        await asyncio.to_thread(
+            self.prepare_venues, [self[i] for i in todo])
+
+        if prefetch:
+            if verbose:
+                print("Prefetching Notion databases...")
+            await notion.prefetch()
+
+        # Building an item may query Zotero and arXiv, so this runs in
+        # worker threads too
+        zitems = None
+        if resolve_entities:
+            built = await asyncio.gather(*[
+                asyncio.to_thread(self.__getitem__, i) for i in todo])
+            zitems = dict(zip(todo, built))
+            await asyncio.to_thread(
+                self.resolve_entities, notion.library, zitems=built)
+
+        semaphore = asyncio.Semaphore(concurrency)
+        done = 0
+
+        async def upload(i: int):
+            nonlocal done
+            async with semaphore:
+                zitem = zitems[i] if zitems is not None \
+                    else await asyncio.to_thread(self.__getitem__, i)
+                await zitem.ato_notion(
+                    cfg, verbose=False, notion=notion, journal=journal,
+                    resume=resume)
+            done += 1
             if verbose:
-                print(f"[{i + 1}/{len(self)}]", end=' ')
-            zitem.to_notion(cfg, verbose=verbose)
+                print(f"[{done}/{len(todo)}] ✅ '{zitem.title}'")
+
+        await asyncio.gather(*[upload(i) for i in todo])
+
+        journal.close()
+
+        if prefetch and verbose:
+            print(
+                f"ℹ️  Prefetching avoided {notion.lookups_avoided} Notion "
+                f"lookups")
+
+    def get_journal(self, cfg: OmegaConf):
+        """Journal of the uploads of this Zotero library to the given
+        Notion papers database.
+        """
+        # Items of the local database have the same keys as in the
+        # synced library, so both share a journal when possible
+        library_id = self.cfg.get('library_id', '???')
+        library_id = 'local' if library_id == '???' else library_id
+        return MigrationJournal(
+            name=f"zotero_{library_id}_{cfg.papers_db_id}")
+
+    def _todo(self, journal: MigrationJournal=None, verbose: bool=True):
+        """Indices of the items not yet uploaded according to the
+        journal.
+        """
+        if journal is None:
+            return list(range(len(self)))
+        todo = [
+            i for i, item in enumerate(self.items)
+            if not journal.is_done(item['key'], item.get('version'))]
+        if verbose and len(todo) < len(self):
+            print(
+                f"ℹ️  Skipping {len(self) - len(todo)} items already "
+                f"uploaded, see {journal.path}")
+        return todo
+
+    def resolve_entities(
+            self,
+            notion: NotionLibrary,
+            zitems: List['ZoteroItem']=None):
+        """Collect the unique authors, venues and topics across the
+        whole library, then resolve or create each of them in Notion
+        exactly once. Papers can then be created without any further
+        entity lookup. Note that entities of papers already in Notion
+        will be created too, if missing.
+        """
+        if self.verbose:
+            print("Resolving authors, venues and topics...")
+
+        people, venues, topics = {}, {}, {}
+        for zitem in (self if zitems is None else zitems):
+            kwargs = zitem._paper_kwargs()
+            people.update(dict.fromkeys(kwargs['authors']))
+            topics.update(dict.fromkeys(kwargs['topics']))
+            if kwargs['venue'] is not None:
+                venues[kwargs['venue']] = None
+
+        if self.verbose:
+            print(
+                f"Found {len(people)} authors, {len(venues)} venues and "
+                f"{len(topics)} topics")
+
+        notion.resolve_entities(
+            people=list(people), venues=list(venues), topics=list(topics))
 
     def __len__(self):
         return len(self.items)
 
     def __getitem__(self, i: int):
-        return ZoteroItem(
-            self.items[i],
-            cfg_venues=self.cfg_venues,
-            library=self.library,
-            ignored_collections=self.cfg.ignored_collections)
+        # Items are built once, so that their lazily computed notes,
+        # tags and venue are not computed again on later accesses
+        item = self.items[i]
+        zitem = self._zitems.get(item['key'])
+        if zitem is None or zitem.item is not item:
+            zitem = ZoteroItem(
+                item,
+                cfg_venues=self.cfg_venues,
+                library=self.library,
+                ignored_collections=self.cfg.ignored_collections,
+                collections=self.collections,
+                notes_index=self.notes_index,
+                arxiv_batch=self.arxiv_batch)
+            self._zitems[item['key']] = zitem
+        return zitem
 
     def __iter__(self):
         for i in range(len(self)):
@@ -134,31 +562,455 @@ class ZoteroLibrary:
         return f"{self.__class__.__name__}({len(self)})"
 
 
+class ZoteroStream(ZoteroLibrary):
+
+    """Streaming counterpart of ZoteroLibrary. Instead of reading the
+    whole library upfront, the items are downloaded page by page in a
+    background thread, and go through the same filters as generator
+    stages. Uploading starts with the first page while the next ones
+    are still downloading, and only a few pages are held in memory at
+    once.
+
+    Since the library is never held in full, items cannot be indexed:
+    iterate over the stream instead. The local snapshot is not used and
+    `resolve_entities` is not supported. Notes are downloaded by pages
+    too, alongside the items, see `download`.
+
+    :param page_size: int
+        Number of items per page, at most 100
+    :param buffer: int
+        Maximum number of pages downloaded ahead of the upload
+    """
+
+    def __init__(
+            self,
+            cfg: OmegaConf,
+            cfg_venues: Union[OmegaConf, VenueMatcher]=None,
+            verbose: bool=False,
+            page_size: int=100,
+            buffer: int=4):
+        keys = ['library_id', 'api_token']
+        users_keys = [f"zotero_{k}" for k in keys]
+        sanity_check_config(cfg, keys, users_keys)
+
+        self.cfg = cfg
+        self.verbose = verbose
+        self.page_size = page_size
+        self.buffer = buffer
+        self.items = None
+        self.notes_index = None
+        self.arxiv_batch = None
+
+        # Number of ignored items, by reason. Unlike ZoteroLibrary, the
+        # ignored items themselves are not kept
+        self.ignored = {}
+
+        # Compile the venue matcher once for all items
+        self.cfg_venues = get_venue_matcher(cfg_venues)
+
+        self.library = zotero.Zotero(
+            self.cfg.library_id,
+            'user',
+            self.cfg.api_token)
+
+        # Collections are few, so their ancestors are resolved upfront
+        if self.verbose:
+            print("Loading collections...")
+        self.collections = self.build_collection_ancestors(
+            self.library.everything(self.library.collections()))
+
+    def _ignore(self, item: Dict, reason: str):
+        reason = reason.split(':')[0]
+        self.ignored[reason] = self.ignored.get(reason, 0) + 1
+
+    def download(self) -> Iterator[List[Dict]]:
+        """Yield the top-level items of the library, page by page.
+        Pages are downloaded in a background thread, up to `buffer`
+        pages ahead of the consumer.
+
+        Notes cannot be requested for a page of items only, so all the
+        notes are downloaded by pages in another background thread and
+        grouped by parent item, like `ZoteroLibrary.load` does. Items
+        with children wait for them, then carry their notes, which are
+        released along with them.
+        """
+        pages = queue.Queue(maxsize=self.buffer)
+        end = object()
+        notes_index = {}
+        notes_ready = threading.Event()
+        notes_error = []
+
+        def notes_worker():
+            try:
+                client = zotero.Zotero(
+                    self.cfg.library_id,
+                    'user',
+                    self.cfg.api_token)
+                notes = client.everything(client.items(
+                    itemType='note', limit=self.page_size))
+                notes_index.update(self.build_notes_index(notes))
+            except Exception as e:
+                notes_error.append(e)
+            finally:
+                notes_ready.set()
+
+        def worker():
+            try:
+                # pyzotero keeps the pagination links on the client, so
+                # the download gets a client of its own
+                client = zotero.Zotero(
+                    self.cfg.library_id,
+                    'user',
+                    self.cfg.api_token)
+                page = client.top(limit=self.page_size)
+                while True:
+                    pages.put(page)
+                    if not client.links or not client.links.get('next'):
+                        break
+                    page = client.follow()
+                pages.put(end)
+            except Exception as e:
+                pages.put(e)
+
+        threading.Thread(target=worker, daemon=True).start()
+        threading.Thread(target=notes_worker, daemon=True).start()
+
+        while True:
+            page = pages.get()
+            if page is end:
+                return
+            if isinstance(page, Exception):
+                raise page
+            for item in page:
+                if item.get('meta', {}).get('numChildren', 0) == 0:
+                    item['notes'] = []
+                    continue
+                notes_ready.wait()
+                if len(notes_error) > 0:
+                    raise notes_error[0]
+                item['notes'] = notes_index.pop(item['key'], [])
+            yield page
+
+    def filter_done(
+            self,
+            items: Iterable[Dict],
+            journal: MigrationJournal) -> Iterator[Dict]:
+        """Only yield the items not yet uploaded according to the
+        journal.
+        """
+        for item in items:
+            if journal.is_done(item['key'], item.get('version')):
+                self._ignore(item, "already uploaded")
+                continue
+            yield item
+
+    def iter_items(
+            self,
+            existing: DuplicateIndex=None,
+            journal: MigrationJournal=None) -> Iterator['ZoteroItem']:
+        """Yield the items of the library as they are downloaded and
+        pass the filters. Venues are resolved by batches of
+        `page_size` items.
+
+        :param existing: DuplicateIndex
+            If provided, items matching a paper of the index are
+            discarded, see `get_notion_index()`
+        :param journal: MigrationJournal
+            If provided, items already uploaded are discarded
+        """
+        items = (item for page in self.download() for item in page)
+        items = self.filter_papers(items)
+        items = self.filter_authors(items)
+        items = self.filter_duplicates(items)
+        if existing is not None:
+            items = self.filter_existing(items, existing)
+        if journal is not None:
+            items = self.filter_done(items, journal)
+
+        while True:
+            batch = list(islice(items, self.page_size))
+            if len(batch) == 0:
+                return
+            zitems = [
+                ZoteroItem(
+                    item,
+                    cfg_venues=self.cfg_venues,
+                    library=self.library,
+                    ignored_collections=self.cfg.ignored_collections,
+                    collections=self.collections,
+                    notes_index=self.notes_index)
+                for item in batch]
+            self.resolve_venues(zitems=zitems)
+            self.fetch_arxiv(zitems=zitems)
+            yield from zitems
+
+    def to_notion(
+            self,
+            cfg: OmegaConf,
+            verbose: bool=True,
+            prefetch: bool=False,
+            concurrency: int=1,
+            resolve_entities: bool=False,
+            resume: bool=False,
+            skip_existing: bool=False):
+        """Move all papers and authors in the Zotero library to Notion,
+        as they are downloaded. See `ZoteroLibrary.to_notion` for the
+        parameters, except for `resolve_entities` which requires the
+        whole library and is ignored.
+        """
+        if resolve_entities:
+            print(
+                "⚠️ Resolving entities upfront is not supported when "
+                "streaming, ignoring it")
+
+        if concurrency > 1:
+            return asyncio.run(self.ato_notion(
+                cfg, verbose=verbose, prefetch=prefetch,
+                concurrency=concurrency, resume=resume,
+                skip_existing=skip_existing))
+
+        # Share a single NotionLibrary across all items, to benefit from
+        # its cache of already-resolved authors, venues and topics
+        notion = NotionLibrary(cfg)
+        existing = self.get_notion_index(notion) if skip_existing else None
+
+        journal = self.get_journal(cfg)
+
+        if prefetch:
+            if verbose:
+                print("Prefetching Notion databases...")
+            notion.prefetch()
+
+        items = self.iter_items(
+            existing=existing, journal=journal if resume else None)
+        for j, zitem in enumerate(items):
+            if verbose:
+                print(f"[{j + 1}]", end=' ')
+            zitem.to_notion(
+                cfg, verbose=verbose, notion=notion, journal=journal,
+                resume=resume)
+
+        journal.close()
+
+        if verbose:
+            self.print_ignored()
+
+    async def ato_notion(
+            self,
+            cfg: OmegaConf,
+            verbose: bool=True,
+            prefetch: bool=False,
+            concurrency: int=8,
+            resolve_entities: bool=False,
+            resume: bool=False,
+            skip_existing: bool=False):
+        """asyncio counterpart of `to_notion`, uploading up to
+        `concurrency` items at once. The next items are only pulled
+        from the stream as uploads complete.
+        """
+        notion = AsyncNotionLibrary(cfg, concurrency=concurrency)
+        existing = None
+        if skip_existing:
+            existing = await asyncio.to_thread(
+                self.get_notion_index, notion.library)
+
+        journal = self.get_journal(cfg)
+
+        if prefetch:
+            if verbose:
+                print("Prefetching Notion databases...")
+            await notion.prefetch()
+
+        # Pulling an item may download a page and query Zotero and
+        # arXiv, so this runs in worker threads too
+        items = self.iter_items(
+            existing=existing, journal=journal if resume else None)
+        semaphore = asyncio.Semaphore(concurrency)
+        tasks = set()
+        done = 0
+
+        async def upload(zitem: ZoteroItem):
+            nonlocal done
+            try:
+                await zitem.ato_notion(
+                    cfg, verbose=False, notion=notion, journal=journal,
+                    resume=resume)
+            finally:
+                semaphore.release()
+            done += 1
+            if verbose:
+                print(f"[{done}] ✅ '{zitem.title}'")
+
+        while True:
+            await semaphore.acquire()
+            zitem = await asyncio.to_thread(next, items, None)
+            if zitem is None:
+                semaphore.release()
+                break
+            task = asyncio.create_task(upload(zitem))
+            tasks.add(task)
+            task.add_done_callback(tasks.discard)
+
+        await asyncio.gather(*tasks)
+
+        journal.close()
+
+        if verbose:
+            self.print_ignored()
+
+    def print_ignored(self):
+        for reason, count in self.ignored.items():
+            print(f"ℹ️  Ignored {count} items: {reason}")
+
+    def __len__(self):
+        raise TypeError(
+            f"{self.__class__.__name__} has no length, iterate over it "
+            f"instead")
+
+    def __getitem__(self, i: int):
+        raise TypeError(
+            f"{self.__class__.__name__} cannot be indexed, iterate over "
+            f"it instead")
+
+    def __iter__(self):
+        return self.iter_items()
+
+    def __repr__(self):
+        return f"{self.__class__.__name__}({self.cfg.library_id})"
+
+
+class BibliographyStream(ZoteroStream):
+
+    """Streaming import of a bibliography export, eg from another
+    reference manager. Entries are parsed one at a time and mapped to
+    Zotero items, which then go through the same filters and uploads
+    as ZoteroStream, without any call to the Zotero API or to the
+    translation server.
+
+    Notes of the entries are kept. Their keywords are parsed as Zotero
+    tags, but these are not uploaded: topics in Notion come from the
+    Zotero collections, which entries do not have.
+
+    :param path: str
+        Path to a BibTeX, CSL-JSON or RIS file
+    :param format: str
+        One of 'bibtex', 'csl-json' or 'ris'. Guessed from the file
+        extension if None
+    :param page_size: int
+        Number of entries whose venues are resolved at once
+    """
+
+    def __init__(
+            self,
+            path: str,
+            cfg: OmegaConf,
+            cfg_venues: Union[OmegaConf, VenueMatcher]=None,
+            verbose: bool=False,
+            format: str=None,
+            page_size: int=100):
+        self.path = Path(path)
+        self.format = format
+        self.cfg = cfg
+        self.verbose = verbose
+        self.page_size = page_size
+        self.library = None
+        self.items = None
+        self.collections = {}
+        self.notes_index = None
+        self.arxiv_batch = None
+        self.ignored = {}
+
+        # Compile the venue matcher once for all items
+        self.cfg_venues = get_venue_matcher(cfg_venues)
+
+    def download(self) -> Iterator[List[Dict]]:
+        """Yield the entries of the file as Zotero items, page by page.
+        Parsing is cheap compared to uploading, so unlike
+        `ZoteroStream.download` it happens in the consumer thread. The
+        notes of each entry are carried by its item, so that they are
+        released along with it.
+        """
+        entries = iter_bibliography(self.path, format=self.format)
+        while True:
+            page = []
+            for item, notes in islice(entries, self.page_size):
+                item['notes'] = notes
+                page.append(item)
+            if len(page) == 0:
+                return
+            yield page
+
+    def get_journal(self, cfg: OmegaConf):
+        """Journal of the uploads of this file to the given Notion
+        papers database.
+        """
+        return MigrationJournal(
+            name=f"import_{self.path.stem}_{cfg.papers_db_id}")
+
+    def __repr__(self):
+        return f"{self.__class__.__name__}({self.path})"
+
+
 class ZoteroItem:
 
     def __init__(
             self,
             item: Dict,
-            cfg_venues: OmegaConf = None,
+            cfg_venues: Union[OmegaConf, VenueMatcher]=None,
             library: zotero.Zotero=None,
-            ignored_collections: List[str]=None):
+            ignored_collections: List[str]=None,
+            collections: Dict[str, List[str]]=None,
+            notes_index: Dict[str, List[str]]=None,
+            arxiv_batch: ArxivBatch=None):
         self.item = item
-        self.cfg_venues = cfg_venues
+        # Compile the venue matcher once, unless one is already given
+        self.cfg_venues = get_venue_matcher(cfg_venues)
         self.library = library
+        self.collections = collections
+        self.notes_index = notes_index
+        self.arxiv_batch = arxiv_batch
+        self.ignored_collections = ignored_collections
 
-        self.notes = self.get_notes()
-        self.tags = self.get_tags(ignored_collections)
-        self.venue = self.get_venue()
+    # Notes, tags and venue may query Zotero and arXiv, so they are only
+    # computed on first access
+
+    @cached_property
+    def notes(self):
+        return self.get_notes()
+
+    @cached_property
+    def tags(self):
+        return self.get_tags(self.ignored_collections)
+
+    @cached_property
+    def venue(self):
+        return self.get_venue()
 
     @classmethod
-    def from_url(cls, url: str, **kwargs):
+    def from_url(cls, url: str, refresh: bool=False, **kwargs):
         """Retrieve metadata for a webpage. This mimics the behavior of
-        the Zotero plugin for adding pages from the browser.
+        the Zotero plugin for adding pages from the browser. Set
+        `refresh` to bypass the translation cache.
+        """
+        return cls(translate_from_url(url, refresh=refresh), **kwargs)
+
+    @classmethod
+    def from_urls(cls, urls: List[str], refresh: bool=False, **kwargs):
+        """Retrieve metadata for several webpages. The pages are
+        translated in parallel by the translation server workers, see
+        `configure_server`. The pages which could not be translated
+        are reported and returned as None.
         """
-        return cls(translate_from_url(url), **kwargs)
+        return [
+            None if item is None else cls(item, **kwargs)
+            for item in translate_from_urls(urls, refresh=refresh)]
 
     @classmethod
-    def from_identifier(cls, identifier: str, **kwargs):
+    def from_identifier(
+            cls,
+            identifier: str,
+            refresh: bool=False,
+            **kwargs):
         """Retrieve metadata from an identifier (DOI, ISBN, PMID, arXiv
         ID). Note that for some of these identifiers, the parsed
         libraries may not provide as extensive metadata as when parsing
@@ -166,7 +1018,9 @@ class ZoteroItem:
         the case when using the DOI: the crossref database will be used,
         which usually does not provide paper abstracts.
         """
-        return cls(translate_from_identifier(identifier), **kwargs)
+        return cls(
+            translate_from_identifier(identifier, refresh=refresh),
+            **kwargs)
 
     @property
     def key(self):
@@ -190,8 +1044,12 @@ class ZoteroItem:
 
     @property
     def arxiv(self):
-        if 'arxiv.org' in self.url:
-            return self.url.split('/')[-1]
+        return self.arxiv_from_url(self.url)
+
+    @staticmethod
+    def arxiv_from_url(url: str):
+        if 'arxiv.org' in url:
+            return url.split('/')[-1]
 
     @property
     def authors(self):
@@ -245,6 +1103,13 @@ class ZoteroItem:
     def get_notes(self):
         notes = ''
 
+        # Read from the notes carried by the item, eg the entries of a
+        # bibliography file, or preloaded by the library, if any
+        if 'notes' in self.item:
+            return self.join_notes(self.item['notes'])
+        if self.notes_index is not None:
+            return self.join_notes(self.notes_index.get(self.key, []))
+
         if 'meta' not in self.item.keys():
             return notes
 
@@ -254,12 +1119,14 @@ class ZoteroItem:
         if self.library is None:
             return notes
 
-        for child in self.library.children(self.key):
-            if child['data']['itemType'] != 'note':
-                continue
-            notes += child['data']['note'] + '\n\n\n'
+        return self.join_notes([
+            child['data']['note']
+            for child in self.library.children(self.key)
+            if child['data']['itemType'] == 'note'])
 
-        return notes
+    @staticmethod
+    def join_notes(notes: List[str]):
+        return ''.join(note + '\n\n\n' for note in notes)
 
     def get_tags(self, ignored_collections: List[str]=None):
         """This is HACKY and specific to my needs: I do not use the
@@ -277,6 +1144,10 @@ class ZoteroItem:
         return tags
 
     def get_collection_ancestors(self, key: str):
+        # Read from the ancestors preloaded by the library, if any
+        if self.collections is not None:
+            return self.collections.get(key, [])
+
         names = []
         if self.library is None:
             return names
@@ -287,6 +1158,15 @@ class ZoteroItem:
             names += self.get_collection_ancestors(parent_key)
         return names
 
+    def venue_texts(self) -> List[str]:
+        """Texts searched for the venue of the item, in the order of
+        `get_venue()`.
+        """
+        fields = [
+            self.item['data'][f] for f in ZOTERO_VENUE_FIELDS
+            if f in self.item['data'].keys()]
+        return fields + [self.notes]
+
     def get_venue(self):
         # Search in the item-type specific fields first
         fallback_text = None
@@ -304,21 +1184,152 @@ class ZoteroItem:
         if venue is not None:
             return venue
 
-        # Search venue on arXiv
+        # Search venue on arXiv, in the papers already fetched by the
+        # library if any. Identifiers missing from the batch, eg the
+        # old-style ones it ignores, are not queried one by one, and
+        # papers which cannot be found do not interrupt the upload
         if self.arxiv is not None and self.arxiv != '':
-            return ArxivItem(self.arxiv, cfg_venues=self.cfg_venues).venue
+            batch = self.arxiv_batch
+            if batch is None:
+                batch = ArxivBatch(cfg_venues=self.cfg_venues)
+                batch.add(self.arxiv)
+                batch.fetch()
+            arxiv_item = batch.get(self.arxiv)
+            return fallback_text if arxiv_item is None else arxiv_item.venue
 
         return fallback_text
 
-    def to_notion(self, cfg: OmegaConf, verbose: bool=True):
+    def to_notion(
+            self,
+            cfg: OmegaConf,
+            verbose: bool=True,
+            notion: NotionLibrary=None,
+            journal: MigrationJournal=None,
+            resume: bool=False):
         """Move paper and authors to Notion. Takes a few seconds...
+        Return the response to the paper creation, or None if the paper
+        already exists or was created by a previous upload.
+
+        :param notion: NotionLibrary
+            Optional NotionLibrary to upload with. Passing the same
+            library across calls allows reusing its cache of already
+            looked-up pages
+        :param journal: MigrationJournal
+            Optional journal in which to record the upload. The page is
+            recorded as 'partial' until its notes are appended
+        :param resume: bool
+            If True and the journal holds a 'partial' upload of the
+            item, only its notes are appended to the existing page
         """
         if verbose:
             print(f"⬆️ Uploading '{self.title}'...")
 
-        # First, create the paper and its properties
-        response = NotionLibrary(cfg).create_paper(
-            self.title,
+        notion = NotionLibrary(cfg) if notion is None else notion
+
+        # First, create the paper and its properties, unless a previous
+        # upload did
+        response, page_id = None, self._partial_page_id(journal, resume)
+        if page_id is None:
+            response = notion.create_paper(
+                self.title, **self._paper_kwargs())
+            page_id = self._created_page_id(journal, response)
+            if page_id is None:
+                return response
+
+        # Second, create the blocks (free text) from the notes
+        if self.notes:
+            self._record(journal, 'partial', page_id)
+            blocks = notion.append_page_blocks(page_id, self.notes)
+            if not self._notes_appended(blocks):
+                return response
+        self._record(journal, 'created', page_id)
+
+        if verbose:
+            print('✅ Done')
+
+        return response
+
+    async def ato_notion(
+            self,
+            cfg: OmegaConf,
+            verbose: bool=True,
+            notion: AsyncNotionLibrary=None,
+            journal: MigrationJournal=None,
+            resume: bool=False):
+        """asyncio counterpart of `to_notion`. Return the response to the
+        paper creation, or None if the paper already exists or was
+        created by a previous upload.
+        """
+        if verbose:
+            print(f"⬆️ Uploading '{self.title}'...")
+
+        notion = AsyncNotionLibrary(cfg) if notion is None else notion
+
+        response, page_id = None, self._partial_page_id(journal, resume)
+        if page_id is None:
+            response = await notion.create_paper(
+                self.title, **self._paper_kwargs())
+            page_id = self._created_page_id(journal, response)
+            if page_id is None:
+                return response
+
+        if self.notes:
+            self._record(journal, 'partial', page_id)
+            blocks = await notion.append_page_blocks(page_id, self.notes)
+            if not self._notes_appended(blocks):
+                return response
+        self._record(journal, 'created', page_id)
+
+        if verbose:
+            print('✅ Done')
+
+        return response
+
+    def _partial_page_id(self, journal: MigrationJournal, resume: bool):
+        if journal is None or not resume:
+            return None
+        return journal.get_partial(self.key, self.item.get('version'))
+
+    def _created_page_id(self, journal: MigrationJournal, response):
+        """Id of the page created for the paper, or None if it already
+        existed or Notion refused it.
+        """
+        if response is None:
+            self._record(journal, 'exists')
+            return None
+        if not response.ok:
+            print(
+                f"❌ Notion refused '{self.title}' "
+                f"({response.status_code}): {response.text}")
+            self._record(journal, 'failed')
+            return None
+        return response.json()['id']
+
+    def _notes_appended(self, response) -> bool:
+        if response.ok:
+            return True
+        print(
+            f"❌ Notion refused the notes of '{self.title}' "
+            f"({response.status_code}): {response.text}")
+        return False
+
+    def _record(
+            self,
+            journal: MigrationJournal,
+            status: str,
+            page_id: str=None):
+        if journal is not None:
+            journal.record(
+                self.key,
+                version=self.item.get('version'),
+                status=status,
+                page_id=page_id)
+
+    def _paper_kwargs(self):
+        """Properties of the paper, as expected by
+        `NotionLibrary.create_paper`.
+        """
+        return dict(
             authors=[f"{x[0]} {x[1]}" for x in self.authors],
             topics=self.tags,
             to_read=True,
@@ -327,14 +1338,6 @@ class ZoteroItem:
             year=self.year,
             venue=self.venue)
 
-        # Second, create the blocks (free text) from the notes
-        if response is not None and self.notes is not None and self.notes != '':
-            paper_id = response.json()['id']
-            NotionLibrary(cfg).append_page_blocks(paper_id, self.notes)
-
-        if verbose:
-            print('✅ Done')
-
     def __repr__(self):
         info = [
             f"{key}={getattr(self, key)}"
@@ -0,0 +1,173 @@
+import os
+import re
+import json
+import mmap
+import struct
+from pathlib import Path
+from email.utils import parsedate_to_datetime
+from typing import Dict, Optional
+
+
+__all__ = ['ArxivIndex', 'get_arxiv_index']
+
+
+INDEX_FILE = "index.bin"
+RECORDS_FILE = "records.jsonl"
+
+# Each index entry holds a null-padded identifier, followed by the
+# offset and length of its record in the records file. Identifiers
+# are at most ~25 characters, eg 'cond-mat.stat-mech/0102536'
+ID_SIZE = 32
+ENTRY = struct.Struct(f'<{ID_SIZE}sQI')
+
+
+def _parse_record(entry: Dict) -> Dict:
+    """Keep the fields NoRA uses from an entry of the arXiv metadata
+    dump, see: https://www.kaggle.com/datasets/Cornell-University/arxiv
+    """
+    versions = entry.get('versions') or []
+    dates = [parsedate_to_datetime(v['created']) for v in versions]
+    authors = [
+        ' '.join(x for x in [first, last, suffix] if x)
+        for last, first, suffix, *_ in entry.get('authors_parsed') or []]
+    return {
+        'id': entry['id'],
+        'title': ' '.join((entry.get('title') or '').split()),
+        'authors': authors,
+        'abstract': (entry.get('abstract') or '').strip(),
+        'comment': entry.get('comments'),
+        'journal_ref': entry.get('journal-ref'),
+        'doi': entry.get('doi'),
+        'categories': (entry.get('categories') or '').split(),
+        'version': versions[-1]['version'] if versions else None,
+        'published': dates[0].isoformat() if dates else None,
+        'updated': dates[-1].isoformat() if dates else None}
+
+
+class ArxivIndex:
+
+    """On-disk index of the arXiv metadata, built from the public
+    JSON-lines dump and stored in ~/.nora/arxiv/. Lookups binary search
+    a memory-mapped file of fixed-size entries sorted by identifier,
+    then read the matching record. Nothing is loaded in memory upfront.
+
+    :param path: str
+        Directory holding the index. Defaults to ~/.nora/arxiv/
+    """
+
+    def __init__(self, path: str=None):
+        self.path = get_index_dir() if path is None else Path(path)
+        self._index_file = open(self.path / INDEX_FILE, 'rb')
+        self._records_file = open(self.path / RECORDS_FILE, 'rb')
+        self._index = self._mmap(self._index_file)
+        self._records = self._mmap(self._records_file)
+
+    @staticmethod
+    def _mmap(f):
+        # Empty files cannot be memory-mapped
+        if os.fstat(f.fileno()).st_size == 0:
+            return b''
+        return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+    @classmethod
+    def build(cls, dump_path: str, path: str=None, verbose: bool=False):
+        """Build the index from an arXiv metadata dump, overwriting any
+        previous index in `path`. The dump is streamed, only the index
+        entries are held in memory while sorting.
+        """
+        path = get_index_dir() if path is None else Path(path)
+        path.mkdir(parents=True, exist_ok=True)
+
+        entries = []
+        with open(dump_path, 'r') as dump, \
+                open(path / f"{RECORDS_FILE}.tmp", 'wb') as records:
+            offset = 0
+            for i, line in enumerate(dump):
+                try:
+                    record = _parse_record(json.loads(line))
+                except (json.JSONDecodeError, KeyError, TypeError,
+                        ValueError):
+                    continue
+                data = (json.dumps(record) + '\n').encode('utf-8')
+                records.write(data)
+                key = record['id'].encode('utf-8')[:ID_SIZE]
+                entries.append(ENTRY.pack(key, offset, len(data)))
+                offset += len(data)
+                if verbose and (i + 1) % 100000 == 0:
+                    print(f"Indexed {i + 1} papers...")
+
+        # Packed entries start with the null-padded identifier, so
+        # sorting the bytes sorts by identifier
+        entries.sort()
+        with open(path / f"{INDEX_FILE}.tmp", 'wb') as f:
+            for entry in entries:
+                f.write(entry)
+
+        os.replace(path / f"{RECORDS_FILE}.tmp", path / RECORDS_FILE)
+        os.replace(path / f"{INDEX_FILE}.tmp", path / INDEX_FILE)
+        if verbose:
+            print(f"✅ Indexed {len(entries)} papers in {path}")
+
+        return cls(path)
+
+    def _find(self, key: bytes) -> Optional[int]:
+        key = key.ljust(ID_SIZE, b'\0')
+        lo, hi = 0, len(self)
+        while lo < hi:
+            mid = (lo + hi) // 2
+            start = mid * ENTRY.size
+            mid_key = self._index[start:start + ID_SIZE]
+            if mid_key < key:
+                lo = mid + 1
+            elif mid_key > key:
+                hi = mid
+            else:
+                return mid
+        return None
+
+    def get(self, arxiv_id: str) -> Optional[Dict]:
+        """Return the record of an arXiv identifier, or None if it is
+        not in the index. Version suffixes are ignored.
+        """
+        arxiv_id = re.sub(r'v\d+$', '', arxiv_id.strip())
+        i = self._find(arxiv_id.encode('utf-8')[:ID_SIZE])
+        if i is None:
+            return None
+        _, offset, length = ENTRY.unpack_from(self._index, i * ENTRY.size)
+        return json.loads(self._records[offset:offset + length])
+
+    def close(self):
+        for x in [self._index, self._records]:
+            if isinstance(x, mmap.mmap):
+                x.close()
+        self._index_file.close()
+        self._records_file.close()
+
+    def __contains__(self, arxiv_id: str):
+        return self.get(arxiv_id) is not None
+
+    def __len__(self):
+        return len(self._index) // ENTRY.size
+
+    def __repr__(self):
+        return f"{self.__class__.__name__}({len(self)})"
+
+
+def get_index_dir():
+    return Path.home() / ".nora" / "arxiv"
+
+
+# Index shared by all arxiv lookups of the process, False until opened
+_arxiv_index = False
+
+
+def get_arxiv_index() -> Optional[ArxivIndex]:
+    """Return the index in ~/.nora/arxiv/, or None if it was not built.
+    See `nora arxiv-index`.
+    """
+    global _arxiv_index
+    if _arxiv_index is False:
+        index_dir = get_index_dir()
+        _arxiv_index = ArxivIndex(index_dir) \
+            if (index_dir / INDEX_FILE).exists() else None
+    return _arxiv_index
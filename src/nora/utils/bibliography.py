@@ -0,0 +1,652 @@
+import re
+import sys
+import json
+import hashlib
+import unicodedata
+from pathlib import Path
+from typing import Dict, List, Tuple, Iterable, Iterator
+
+
+__all__ = [
+    'BIBLIOGRAPHY_FORMATS',
+    'iter_bibliography',
+    'iter_bibtex',
+    'iter_csl_json',
+    'iter_ris']
+
+
+# Supported formats, with their usual file extensions
+BIBLIOGRAPHY_FORMATS = {
+    'bibtex': ['.bib', '.bibtex'],
+    'csl-json': ['.json', '.jsonl'],
+    'ris': ['.ris']}
+
+# Zotero item types of the BibTeX entry types. Preprints and other
+# unpublished works are imported as manuscripts, like Zotero does for
+# @unpublished
+BIBTEX_TYPES = {
+    'article': 'journalArticle',
+    'inproceedings': 'conferencePaper',
+    'conference': 'conferencePaper',
+    'proceedings': 'book',
+    'book': 'book',
+    'booklet': 'book',
+    'inbook': 'bookSection',
+    'incollection': 'bookSection',
+    'phdthesis': 'thesis',
+    'mastersthesis': 'thesis',
+    'thesis': 'thesis',
+    'techreport': 'report',
+    'report': 'report',
+    'patent': 'patent',
+    'online': 'webpage',
+    'electronic': 'webpage',
+    'www': 'webpage',
+    'misc': 'manuscript',
+    'unpublished': 'manuscript',
+    'preprint': 'manuscript'}
+
+# Zotero item types of the CSL types. Preprints are CSL 'article's
+CSL_TYPES = {
+    'article': 'manuscript',
+    'article-journal': 'journalArticle',
+    'article-magazine': 'magazineArticle',
+    'article-newspaper': 'newspaperArticle',
+    'paper-conference': 'conferencePaper',
+    'book': 'book',
+    'chapter': 'bookSection',
+    'entry-encyclopedia': 'encyclopediaArticle',
+    'manuscript': 'manuscript',
+    'patent': 'patent',
+    'post': 'webpage',
+    'post-weblog': 'blogPost',
+    'report': 'report',
+    'speech': 'presentation',
+    'thesis': 'thesis',
+    'webpage': 'webpage'}
+
+# Zotero item types of the RIS reference types
+RIS_TYPES = {
+    'JOUR': 'journalArticle',
+    'JFULL': 'journalArticle',
+    'EJOUR': 'journalArticle',
+    'MGZN': 'magazineArticle',
+    'NEWS': 'newspaperArticle',
+    'CONF': 'conferencePaper',
+    'CPAPER': 'conferencePaper',
+    'BOOK': 'book',
+    'EBOOK': 'book',
+    'EDBOOK': 'book',
+    'CHAP': 'bookSection',
+    'ECHAP': 'bookSection',
+    'ENCYC': 'encyclopediaArticle',
+    'THES': 'thesis',
+    'RPRT': 'report',
+    'PAT': 'patent',
+    'ELEC': 'webpage',
+    'BLOG': 'blogPost',
+    'SLIDE': 'presentation',
+    'UNPB': 'manuscript',
+    'MANSCPT': 'manuscript',
+    'GEN': 'manuscript'}
+
+# Zotero field holding the title of the container of an item, eg the
+# journal of an article. See ZOTERO_VENUE_FIELDS
+CONTAINER_FIELDS = {
+    'conferencePaper': 'proceedingsTitle',
+    'bookSection': 'bookTitle',
+    'webpage': 'websiteTitle',
+    'blogPost': 'blogTitle',
+    'encyclopediaArticle': 'encyclopediaTitle',
+    'presentation': 'meetingName'}
+
+MONTHS = [
+    'jan', 'feb', 'mar', 'apr', 'may', 'jun',
+    'jul', 'aug', 'sep', 'oct', 'nov', 'dec']
+
+
+def iter_bibliography(
+        path: str,
+        format: str=None) -> Iterator[Tuple[Dict, List[str]]]:
+    """Yield the entries of a bibliography export one at a time, as
+    items formatted like the objects returned by the Zotero API, along
+    with the notes of each entry. The file is never loaded in full.
+
+    :param path: str
+        Path to a BibTeX, CSL-JSON or RIS file
+    :param format: str
+        One of BIBLIOGRAPHY_FORMATS. Guessed from the file extension if
+        None
+    """
+    path = Path(path)
+    if format is None:
+        suffix = path.suffix.lower()
+        format = next((
+            name for name, suffixes in BIBLIOGRAPHY_FORMATS.items()
+            if suffix in suffixes), None)
+    readers = {'bibtex': iter_bibtex, 'csl-json': iter_csl_json,
+               'ris': iter_ris}
+    if format not in readers:
+        print(
+            f"❌ Could not guess the format of '{path}'. Please use one "
+            f"of: {', '.join(BIBLIOGRAPHY_FORMATS)}.")
+        sys.exit(1)
+    return readers[format](path)
+
+
+def _make_item(
+        key: str,
+        item_type: str,
+        fields: Dict[str, str],
+        creators: List[Dict],
+        tags: List[str]) -> Dict:
+    """Format an entry like the items of the Zotero API. The version
+    is a hash of the content of the entry, so that edited entries are
+    uploaded again. The key is the citation key of the entry followed
+    by this hash, since citation keys are not always unique, or only
+    the hash when the entry has no citation key.
+    """
+    fields = {k: v.strip() for k, v in fields.items() if v and v.strip()}
+    data = {
+        'itemType': item_type,
+        'title': '',
+        'creators': creators,
+        'abstractNote': '',
+        'date': '',
+        'url': '',
+        'extra': '',
+        'tags': [{'tag': tag} for tag in tags],
+        'collections': [],
+        'relations': {}}
+    data.update(fields)
+
+    # Point to the DOI or the arXiv abstract when there is no URL, the
+    # latter allows the arXiv venue fallback of ZoteroItem
+    arxiv_id = fields.get('arXiv')
+    if not data['url'] and data.get('DOI'):
+        data['url'] = f"https://doi.org/{data['DOI']}"
+    elif not data['url'] and arxiv_id:
+        data['url'] = f"https://arxiv.org/abs/{arxiv_id}"
+    if arxiv_id:
+        del data['arXiv']
+        data['extra'] = '\n'.join(
+            x for x in [data['extra'], f"arXiv: {arxiv_id}"] if x)
+
+    content = json.dumps(data, sort_keys=True)
+    version = hashlib.sha1(content.encode('utf-8')).hexdigest()[:12]
+    key = f"{key}_{version[:8]}" if key else version.upper()[:8]
+    data['key'] = key
+    data['version'] = version
+
+    return {
+        'key': key,
+        'version': version,
+        'meta': {'numChildren': 0},
+        'data': data}
+
+
+def _format_date(year: str, month: str=None, day: str=None) -> str:
+    """Format a date as 'YYYY', 'YYYY-MM' or 'YYYY-MM-DD'. Months may
+    be numbers or English month names.
+    """
+    year = (year or '').strip()
+    if not year:
+        return ''
+    month = (month or '').strip().lower()
+    if month[:3] in MONTHS:
+        month = str(MONTHS.index(month[:3]) + 1)
+    if not month.isnumeric():
+        return year
+    date = f"{year}-{int(month):02d}"
+    day = (day or '').strip()
+    return f"{date}-{int(day):02d}" if day.isnumeric() else date
+
+
+def _container_field(item_type: str) -> str:
+    return CONTAINER_FIELDS.get(item_type, 'publicationTitle')
+
+
+def _split_keywords(text: str) -> List[str]:
+    return [x.strip() for x in re.split(r'[,;]', text or '') if x.strip()]
+
+
+# -------------------------------------------------------------------------
+#  BibTeX
+# -------------------------------------------------------------------------
+
+BIBTEX_ENTRY = re.compile(r'@\s*(\w+)\s*([{(])')
+BIBTEX_FIELD = re.compile(r'[\s,]*([\w\-:.]+)\s*=\s*')
+BIBTEX_CONCAT = re.compile(r'\s*#\s*')
+BIBTEX_WORD = re.compile(r'[^\s,#}]+')
+
+# Combining characters of the LaTeX accents
+LATEX_ACCENTS = {
+    '`': '\u0300', "'": '\u0301', '^': '\u0302', '~': '\u0303',
+    '=': '\u0304', 'u': '\u0306', '.': '\u0307', '"': '\u0308',
+    'r': '\u030a', 'H': '\u030b', 'v': '\u030c', 'c': '\u0327'}
+LATEX_SYMBOL_ACCENT = re.compile(
+    r'\\([`\'^~=."])\s*(?:\{\s*\\?([a-zA-Z])\s*\}|\\?([a-zA-Z]))')
+LATEX_LETTER_ACCENT = re.compile(
+    r'\\([uvHcr])(?:\s*\{\s*\\?([a-zA-Z])\s*\}|\s+\\?([a-zA-Z]))')
+LATEX_LETTERS = {
+    'ss': 'ß', 'ae': 'æ', 'AE': 'Æ', 'oe': 'œ', 'OE': 'Œ', 'aa': 'å',
+    'AA': 'Å', 'o': 'ø', 'O': 'Ø', 'l': 'ł', 'L': 'Ł', 'i': 'i', 'j': 'j'}
+LATEX_LETTER = re.compile(
+    r'\\(ss|ae|AE|oe|OE|aa|AA|o|O|l|L|i|j)(?![a-zA-Z])(?:\s*\{\})?')
+LATEX_COMMAND = re.compile(r'\\[a-zA-Z]+\s*(?=\{)')
+LATEX_ESCAPE = re.compile(r'\\([&%$_#{}])')
+
+
+def _clean_latex(text: str) -> str:
+    """Turn the LaTeX markup of a BibTeX value into plain text: accents
+    become unicode characters, formatting commands and braces are
+    dropped.
+    """
+    def accent(match):
+        letter = match.group(2) or match.group(3)
+        return unicodedata.normalize(
+            'NFC', letter + LATEX_ACCENTS[match.group(1)])
+
+    text = LATEX_SYMBOL_ACCENT.sub(accent, text)
+    text = LATEX_LETTER_ACCENT.sub(accent, text)
+    text = LATEX_LETTER.sub(lambda m: LATEX_LETTERS[m.group(1)], text)
+    text = LATEX_COMMAND.sub('', text)
+    text = re.sub(r'(?<!\\)[{}]', '', text)
+    text = LATEX_ESCAPE.sub(r'\1', text)
+    text = text.replace('~', ' ')
+    return ' '.join(text.split())
+
+
+def _split_braced(text: str, separator: re.Pattern) -> List[str]:
+    """Split on the separator, outside of braces only.
+    """
+    parts, depth, start, i = [], 0, 0, 0
+    while i < len(text):
+        c = text[i]
+        if c == '{':
+            depth += 1
+        elif c == '}':
+            depth -= 1
+        elif depth == 0:
+            match = separator.match(text, i)
+            if match is not None and match.end() > i:
+                parts.append(text[start:i])
+                start = i = match.end()
+                continue
+        i += 1
+    parts.append(text[start:])
+    return [x.strip() for x in parts if x.strip()]
+
+
+def _parse_bibtex_name(name: str, creator_type: str) -> Dict:
+    """Parse a name in any of the BibTeX forms: 'First von Last',
+    'von Last, First' or 'von Last, Jr, First'. Fully-braced names,
+    eg institutions, are kept as a single field.
+    """
+    if name.startswith('{') and name.endswith('}') \
+            and len(_split_braced(name, re.compile(r'\s'))) == 1:
+        return {'creatorType': creator_type, 'name': _clean_latex(name)}
+
+    parts = _split_braced(name, re.compile(r','))
+    if len(parts) > 1:
+        last, first = parts[0], parts[-1]
+    else:
+        words = _split_braced(name, re.compile(r'\s+'))
+        # Lowercase words, eg 'van der', start the last name
+        i = next((
+            i for i, w in enumerate(words[:-1])
+            if i > 0 and w[:1].islower()), len(words) - 1)
+        first, last = ' '.join(words[:i]), ' '.join(words[i:])
+
+    return {
+        'creatorType': creator_type,
+        'firstName': _clean_latex(first),
+        'lastName': _clean_latex(last)}
+
+
+def _split_bibtex(lines: Iterable[str]) -> Iterator[Tuple[str, str]]:
+    """Yield the type and raw content of the entries of a BibTeX file,
+    reading it line by line. Text outside of entries is ignored.
+    """
+    entry_type = None
+    for line in lines:
+        while line:
+            if entry_type is None:
+                match = BIBTEX_ENTRY.search(line)
+                if match is None:
+                    break
+                entry_type = match.group(1).lower()
+                close = '}' if match.group(2) == '{' else ')'
+                line = line[match.end():]
+                chunks, depth = [], 0
+
+            end = None
+            for i, c in enumerate(line):
+                if depth == 0 and c == close:
+                    end = i
+                    break
+                if c == '{':
+                    depth += 1
+                elif c == '}':
+                    depth -= 1
+
+            if end is None:
+                chunks.append(line)
+                break
+            chunks.append(line[:end])
+            yield entry_type, ''.join(chunks)
+            entry_type = None
+            line = line[end + 1:]
+
+
+def _parse_bibtex_fields(text: str, strings: Dict[str, str]) -> Dict:
+    """Parse the 'name = value' fields of an entry. Values may be
+    braced, quoted, numbers or @string macros, concatenated with '#'.
+    """
+    fields = {}
+    i, n = 0, len(text)
+    while i < n:
+        match = BIBTEX_FIELD.match(text, i)
+        if match is None:
+            break
+        name = match.group(1).lower()
+        i = match.end()
+
+        parts = []
+        while i < n:
+            if text[i] == '{':
+                j, depth = i + 1, 1
+                while j < n and depth > 0:
+                    depth += {'{': 1, '}': -1}.get(text[j], 0)
+                    j += 1
+                parts.append(text[i + 1:j - 1])
+                i = j
+            elif text[i] == '"':
+                j, depth = i + 1, 0
+                while j < n and (text[j] != '"' or depth > 0):
+                    depth += {'{': 1, '}': -1}.get(text[j], 0)
+                    j += 1
+                parts.append(text[i + 1:j])
+                i = j + 1
+            else:
+                word = BIBTEX_WORD.match(text, i)
+                if word is None:
+                    break
+                parts.append(strings.get(word.group(0).lower(), word.group(0)))
+                i = word.end()
+
+            concat = BIBTEX_CONCAT.match(text, i)
+            if concat is None:
+                break
+            i = concat.end()
+
+        fields[name] = ''.join(parts)
+    return fields
+
+
+def _bibtex_to_item(entry_type: str, key: str, fields: Dict) -> Dict:
+    item_type = BIBTEX_TYPES.get(entry_type, 'manuscript')
+    raw = fields
+    fields = {k: _clean_latex(v) for k, v in fields.items()}
+
+    creators = []
+    separator = re.compile(r'\s+and\s+')
+    for field, creator_type in [('author', 'author'), ('editor', 'editor')]:
+        for name in _split_braced(raw.get(field, ''), separator):
+            creators.append(_parse_bibtex_name(name, creator_type))
+
+    date = fields.get('date') or _format_date(
+        fields.get('year'), fields.get('month'))
+
+    container = fields.get('journal') or fields.get('journaltitle') \
+        or fields.get('booktitle')
+    school = fields.get('school') or fields.get('institution')
+    school_field = 'institution' if item_type == 'report' else 'university'
+
+    arxiv_id = None
+    if fields.get('eprinttype', fields.get('archiveprefix', '')).lower() \
+            == 'arxiv':
+        arxiv_id = fields.get('eprint')
+
+    data = {
+        'title': fields.get('title'),
+        'abstractNote': fields.get('abstract'),
+        'date': date,
+        'url': fields.get('url'),
+        'DOI': fields.get('doi'),
+        'ISBN': fields.get('isbn'),
+        'ISSN': fields.get('issn'),
+        'volume': fields.get('volume'),
+        'issue': fields.get('number'),
+        'pages': fields.get('pages', '').replace('--', '-'),
+        'publisher': fields.get('publisher'),
+        'place': fields.get('address') or fields.get('location'),
+        'series': fields.get('series'),
+        _container_field(item_type): container,
+        school_field: school,
+        'arXiv': arxiv_id}
+
+    tags = _split_keywords(fields.get('keywords'))
+    return _make_item(key, item_type, data, creators, tags)
+
+
+def iter_bibtex(path: str) -> Iterator[Tuple[Dict, List[str]]]:
+    """Yield the entries of a BibTeX file as Zotero items, with the
+    'note' and 'annote' fields as notes. See `iter_bibliography`.
+    """
+    # Standard month macros
+    strings = {m: m for m in MONTHS}
+
+    with open(path, 'r', encoding='utf-8', errors='replace') as f:
+        for entry_type, content in _split_bibtex(f):
+            if entry_type in ['comment', 'preamble']:
+                continue
+
+            if entry_type == 'string':
+                fields = _parse_bibtex_fields(content, strings)
+                strings.update(fields)
+                continue
+
+            key, _, content = content.partition(',')
+            fields = _parse_bibtex_fields(content, strings)
+            item = _bibtex_to_item(entry_type, key.strip(), fields)
+            notes = [
+                _clean_latex(fields[k]) for k in ['note', 'annote']
+                if fields.get(k)]
+            yield item, notes
+
+
+# -------------------------------------------------------------------------
+#  CSL-JSON
+# -------------------------------------------------------------------------
+
+def _iter_json_objects(f, chunk_size: int=1 << 16) -> Iterator[Dict]:
+    """Yield the objects of a JSON array, or of JSON lines, reading the
+    file by chunks.
+    """
+    decoder = json.JSONDecoder()
+    buffer = ''
+    eof = False
+    while True:
+        buffer = buffer.lstrip(' \t\r\n,[')
+        if buffer.startswith(']') or (eof and not buffer):
+            return
+        try:
+            obj, end = decoder.raw_decode(buffer)
+        except json.JSONDecodeError:
+            if eof:
+                print(f"❌ Could not parse '{f.name}' as CSL-JSON.")
+                sys.exit(1)
+            chunk = f.read(chunk_size)
+            eof = len(chunk) == 0
+            buffer += chunk
+            continue
+        buffer = buffer[end:]
+        yield obj
+
+
+def _csl_date(date: Dict) -> str:
+    if not isinstance(date, dict):
+        return ''
+    parts = (date.get('date-parts') or [[]])[0]
+    if parts and parts[0]:
+        return _format_date(*[str(x) for x in parts[:3]])
+    return date.get('raw') or date.get('literal') or ''
+
+
+def _csl_to_item(entry: Dict) -> Dict:
+    item_type = CSL_TYPES.get(entry.get('type'), 'manuscript')
+
+    creators = []
+    for field, creator_type in [('author', 'author'), ('editor', 'editor')]:
+        for name in entry.get(field) or []:
+            if 'family' not in name:
+                creators.append({
+                    'creatorType': creator_type,
+                    'name': name.get('literal', '')})
+                continue
+            last = ' '.join(x for x in [
+                name.get('non-dropping-particle'), name['family'],
+                name.get('suffix')] if x)
+            creators.append({
+                'creatorType': creator_type,
+                'firstName': ' '.join(x for x in [
+                    name.get('given'), name.get('dropping-particle')] if x),
+                'lastName': last})
+
+    def get(field):
+        value = entry.get(field)
+        return '' if value is None else str(value)
+
+    url = get('URL')
+    arxiv_id = None
+    if get('archive').lower() == 'arxiv':
+        arxiv_id = re.sub(r'^arxiv:', '', get('number'), flags=re.I)
+
+    data = {
+        'title': get('title'),
+        'abstractNote': get('abstract'),
+        'date': _csl_date(entry.get('issued')),
+        'url': url,
+        'DOI': get('DOI'),
+        'ISBN': get('ISBN'),
+        'ISSN': get('ISSN'),
+        'volume': get('volume'),
+        'issue': get('issue'),
+        'pages': get('page'),
+        'publisher': get('publisher'),
+        'place': get('publisher-place'),
+        'journalAbbreviation': get('container-title-short'),
+        'conferenceName': get('event-title') or get('event'),
+        _container_field(item_type): get('container-title'),
+        'arXiv': arxiv_id}
+
+    return _make_item(
+        get('id'), item_type, data, creators,
+        _split_keywords(get('keyword')))
+
+
+def iter_csl_json(path: str) -> Iterator[Tuple[Dict, List[str]]]:
+    """Yield the entries of a CSL-JSON file as Zotero items, with the
+    'note' field as notes. JSON lines are supported too. See
+    `iter_bibliography`.
+    """
+    with open(path, 'r', encoding='utf-8') as f:
+        for entry in _iter_json_objects(f):
+            if not isinstance(entry, dict):
+                continue
+            notes = [entry['note']] if entry.get('note') else []
+            yield _csl_to_item(entry), notes
+
+
+# -------------------------------------------------------------------------
+#  RIS
+# -------------------------------------------------------------------------
+
+RIS_LINE = re.compile(r'^([A-Z][A-Z0-9])  -(?: (.*))?$')
+
+
+def _split_ris(lines: Iterable[str]) -> Iterator[Dict[str, List[str]]]:
+    """Yield the records of a RIS file, reading it line by line, as
+    lists of values by tag. Untagged lines continue the previous value.
+    """
+    record, tag = None, None
+    for line in lines:
+        line = line.rstrip('\r\n').lstrip('\ufeff')
+        match = RIS_LINE.match(line)
+        if match is None:
+            if record is not None and tag is not None and line.strip():
+                record[tag][-1] += ' ' + line.strip()
+            continue
+
+        tag, value = match.group(1), (match.group(2) or '').strip()
+        if tag == 'TY':
+            record = {}
+        if record is None:
+            continue
+        if tag == 'ER':
+            yield record
+            record, tag = None, None
+            continue
+        record.setdefault(tag, []).append(value)
+
+
+def _ris_to_item(record: Dict[str, List[str]]) -> Dict:
+    item_type = RIS_TYPES.get(record['TY'][0], 'manuscript')
+
+    def get(*tags):
+        for tag in tags:
+            if record.get(tag) and record[tag][0]:
+                return record[tag][0]
+        return ''
+
+    creators = []
+    for tags, creator_type in [(['AU', 'A1'], 'author'),
+                               (['A2', 'ED'], 'editor')]:
+        for tag in tags:
+            for name in record.get(tag, []):
+                last, _, first = name.partition(',')
+                creators.append({
+                    'creatorType': creator_type,
+                    'firstName': first.strip(),
+                    'lastName': last.strip()})
+
+    # Dates are 'YYYY/MM/DD/other', with any part possibly empty
+    date = get('DA', 'PY', 'Y1')
+    date = _format_date(*(date.split('/') + ['', ''])[:3]) \
+        if '/' in date else date
+
+    container = get('T2', 'JF', 'JO', 'BT', 'C3')
+    publisher_field = {
+        'thesis': 'university',
+        'report': 'institution'}.get(item_type, 'publisher')
+    pages = '-'.join(x for x in [get('SP'), get('EP')] if x)
+    serial = 'ISBN' if item_type in ['book', 'bookSection'] else 'ISSN'
+
+    data = {
+        'title': get('TI', 'T1'),
+        'abstractNote': get('AB', 'N2'),
+        'date': date,
+        'url': get('UR'),
+        'DOI': get('DO'),
+        serial: get('SN'),
+        'volume': get('VL'),
+        'issue': get('IS'),
+        'pages': pages,
+        'place': get('CY'),
+        'journalAbbreviation': get('JA', 'J2'),
+        _container_field(item_type): container,
+        publisher_field: get('PB')}
+
+    tags = [t for value in record.get('KW', []) for t in
+            _split_keywords(value)]
+    return _make_item(get('ID'), item_type, data, creators, tags)
+
+
+def iter_ris(path: str) -> Iterator[Tuple[Dict, List[str]]]:
+    """Yield the entries of a RIS file as Zotero items, with the 'N1'
+    fields as notes. See `iter_bibliography`.
+    """
+    with open(path, 'r', encoding='utf-8', errors='replace') as f:
+        for record in _split_ris(f):
+            yield _ris_to_item(record), record.get('N1', [])
@@ -1,6 +1,13 @@
 import click
 from nora.utils.config import load_config, configure_user_config
-from nora.parsers.zotero import ZoteroLibrary, ZoteroItem
+from nora.parsers.zotero import ZoteroLibrary, ZoteroStream, ZoteroItem, \
+    BibliographyStream
+from nora.parsers.notion import NotionLibrary
+from nora.utils.mirror import NotionMirror
+from nora.utils.arxiv_index import ArxivIndex
+from nora.utils.bibliography import BIBLIOGRAPHY_FORMATS
+from nora.utils.translation_server import configure_server, start_daemon, \
+    stop_daemon, daemon_status
 
 
 @click.group()
@@ -22,17 +29,24 @@ def configure():
 #  nora url ...
 # -------------------------------------------------------------------------
 @cli.command("url")
-@click.argument("url")
-def url_command(url: str):
-    """Process a paper from its URL (e.g., arXiv, DOI)."""
+@click.argument("urls", nargs=-1, required=True)
+@click.option(
+    "--refresh", is_flag=True,
+    help="Retrieve the metadata again instead of using the cached one.")
+def url_command(urls: tuple, refresh: bool):
+    """Process papers from their URLs (e.g., arXiv, DOI)."""
     cfg = load_config()
+    configure_server(**cfg.translation_server)
 
-    # Load from url
-    item = ZoteroItem.from_url(url, cfg_venues=cfg.venues)
+    # Load from urls
+    items = ZoteroItem.from_urls(
+        list(urls), refresh=refresh, cfg_venues=cfg.venues)
 
-    # Upload data to NoRA
-    if item is not None:
-        item.to_notion(cfg.notion, verbose=cfg.verbose)
+    # Upload data to NoRA, sharing the Notion lookups across items
+    notion = NotionLibrary(cfg.notion)
+    for item in items:
+        if item is not None:
+            item.to_notion(cfg.notion, verbose=cfg.verbose, notion=notion)
 
 
 # -------------------------------------------------------------------------
@@ -40,12 +54,17 @@ def url_command(url: str):
 # -------------------------------------------------------------------------
 @cli.command("id")
 @click.argument("id")
-def id_command(id: str):
+@click.option(
+    "--refresh", is_flag=True,
+    help="Retrieve the metadata again instead of using the cached one.")
+def id_command(id: str, refresh: bool):
     """Process a Notion item by its ID."""
     cfg = load_config()
+    configure_server(**cfg.translation_server)
 
     # Load from url
-    item = ZoteroItem.from_identifier(id, cfg_venues=cfg.venues)
+    item = ZoteroItem.from_identifier(
+        id, refresh=refresh, cfg_venues=cfg.venues)
 
     # Upload data to NoRA
     if item is not None:
@@ -56,15 +75,164 @@ def id_command(id: str):
 #  nora zotero-upload
 # -------------------------------------------------------------------------
 @cli.command("zotero-upload")
-def zotero_upload_command():
+@click.option(
+    "--prefetch", is_flag=True,
+    help="Read the people, affiliations, venues and topics Notion "
+         "databases once upfront instead of querying them per item.")
+@click.option(
+    "--concurrency", default=1, show_default=True,
+    help="Number of items uploaded concurrently.")
+@click.option(
+    "--resolve-entities", is_flag=True,
+    help="Resolve the unique authors, venues and topics of the library "
+         "once before uploading any paper.")
+@click.option(
+    "--fresh", is_flag=True,
+    help="Ignore the items recorded as uploaded by previous runs and "
+         "upload the whole library again.")
+@click.option(
+    "--skip-existing", is_flag=True,
+    help="Skip items matching a paper already in Notion by DOI, arXiv "
+         "identifier or title, before any other work.")
+@click.option(
+    "--stream", is_flag=True,
+    help="Upload items as the library is downloaded, page by page, "
+         "instead of reading the whole library first.")
+def zotero_upload_command(
+        prefetch: bool,
+        concurrency: int,
+        resolve_entities: bool,
+        fresh: bool,
+        skip_existing: bool,
+        stream: bool):
     """Upload items to Zotero."""
     click.echo("📚 Uploading Zotero to NoRA")
 
     cfg = load_config()
 
     # Load from url
-    item = ZoteroLibrary(cfg.zotero, cfg_venues=cfg.venues, verbose=cfg.verbose)
+    library_cls = ZoteroStream if stream else ZoteroLibrary
+    item = library_cls(cfg.zotero, cfg_venues=cfg.venues, verbose=cfg.verbose)
 
     # Upload data to NoRA
     if item is not None:
-        item.to_notion(cfg.notion, verbose=cfg.verbose)
+        item.to_notion(
+            cfg.notion, verbose=cfg.verbose, prefetch=prefetch,
+            concurrency=concurrency, resolve_entities=resolve_entities,
+            resume=not fresh, skip_existing=skip_existing)
+
+
+# -------------------------------------------------------------------------
+#  nora import
+# -------------------------------------------------------------------------
+@cli.command("import")
+@click.argument("file", type=click.Path(exists=True, dir_okay=False))
+@click.option(
+    "--format", "format_", type=click.Choice(list(BIBLIOGRAPHY_FORMATS)),
+    help="Format of the file. Guessed from its extension by default.")
+@click.option(
+    "--prefetch", is_flag=True,
+    help="Read the people, affiliations, venues and topics Notion "
+         "databases once upfront instead of querying them per item.")
+@click.option(
+    "--concurrency", default=1, show_default=True,
+    help="Number of items uploaded concurrently.")
+@click.option(
+    "--fresh", is_flag=True,
+    help="Ignore the entries recorded as uploaded by previous imports of "
+         "the file and upload all of them again.")
+@click.option(
+    "--skip-existing", is_flag=True,
+    help="Skip entries matching a paper already in Notion by DOI, arXiv "
+         "identifier or title, before any other work.")
+def import_command(
+        file: str,
+        format_: str,
+        prefetch: bool,
+        concurrency: int,
+        fresh: bool,
+        skip_existing: bool):
+    """Upload the entries of a BibTeX, CSL-JSON or RIS export."""
+    click.echo(f"📚 Importing {file} to NoRA")
+
+    cfg = load_config()
+
+    stream = BibliographyStream(
+        file, cfg.zotero, cfg_venues=cfg.venues, verbose=cfg.verbose,
+        format=format_)
+
+    # Upload data to NoRA
+    stream.to_notion(
+        cfg.notion, verbose=cfg.verbose, prefetch=prefetch,
+        concurrency=concurrency, resume=not fresh,
+        skip_existing=skip_existing)
+
+
+# -------------------------------------------------------------------------
+#  nora notion-sync
+# -------------------------------------------------------------------------
+@cli.command("notion-sync")
+@click.option(
+    "--full", is_flag=True,
+    help="Rebuild the mirror from scratch instead of only pulling the "
+         "pages edited since the last sync.")
+def notion_sync_command(full: bool):
+    """Refresh the local mirror of your Notion databases."""
+    cfg = load_config()
+
+    notion = NotionLibrary(cfg.notion)
+    if notion.mirror is None:
+        notion.mirror = NotionMirror()
+        notion.sync_mirror(full=full)
+    elif full:
+        notion.sync_mirror(full=True)
+
+    click.echo(f"✅ Mirror holds {len(notion.mirror)} pages")
+
+
+# -------------------------------------------------------------------------
+#  nora server start|stop|status
+# -------------------------------------------------------------------------
+@cli.group("server")
+def server_group():
+    """Run the translation server in the background, so that `nora url`
+    and `nora id` do not have to start it on each call."""
+    pass
+
+
+@server_group.command("start")
+def server_start_command():
+    """Start the translation server daemon."""
+    cfg = load_config()
+    configure_server(**cfg.translation_server)
+    start_daemon()
+
+
+@server_group.command("stop")
+def server_stop_command():
+    """Stop the translation server daemon."""
+    stop_daemon()
+
+
+@server_group.command("status")
+def server_status_command():
+    """Show the status of the translation server daemon."""
+    status = daemon_status()
+    if len(status) == 0:
+        click.echo("ℹ️ No translation server daemon running.")
+        return
+    for port, state in status.items():
+        icon = '✅' if state == 'running' else '❌'
+        click.echo(f"{icon} Worker on port {port}: {state}")
+
+
+# -------------------------------------------------------------------------
+#  nora arxiv-index
+# -------------------------------------------------------------------------
+@cli.command("arxiv-index")
+@click.argument("dump", type=click.Path(exists=True, dir_okay=False))
+def arxiv_index_command(dump: str):
+    """Build a local index of arXiv papers from the arXiv metadata dump,
+    so that arXiv lookups do not query the arXiv API."""
+    click.echo("🗂️ Building the arXiv index, this may take a while...")
+    ArxivIndex.build(dump, verbose=True)
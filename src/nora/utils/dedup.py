@@ -0,0 +1,136 @@
+import re
+import unicodedata
+from typing import Dict, List, Tuple, Optional
+
+
+__all__ = [
+    'DuplicateIndex',
+    'normalize_title',
+    'normalize_doi',
+    'normalize_isbn',
+    'find_arxiv_id']
+
+
+# New-style arXiv identifiers (after March 2007), optionally versioned
+ARXIV_ID_PATTERN = re.compile(r'(?<![\d.])(\d{4}\.\d{4,5})(v\d+)?(?![\d])')
+
+# DOIs end at the query string or fragment of DOI urls
+DOI_PATTERN = re.compile(r'\b(10\.\d{4,9}/[^\s?#]+)', re.IGNORECASE)
+
+
+def normalize_title(title: str) -> str:
+    """Fold case, accents and punctuation out of a title, so that minor
+    typographic variations of the same title compare equal.
+    """
+    title = unicodedata.normalize('NFKD', title)
+    title = ''.join(c for c in title if not unicodedata.combining(c))
+    title = re.sub(r'[\W_]+', ' ', title.casefold())
+    return ' '.join(title.split())
+
+
+def normalize_doi(doi: str) -> Optional[str]:
+    match = DOI_PATTERN.search(doi)
+    if match is None:
+        return None
+    # Drop the punctuation following DOIs quoted in text, but keep the
+    # closing parentheses which belong to the DOI
+    doi = match.group(1)
+    while doi[-1] in '.,;)':
+        if doi[-1] == ')' and doi.count('(') >= doi.count(')'):
+            break
+        doi = doi[:-1]
+    return doi.lower()
+
+
+def normalize_isbn(isbn: str) -> Optional[str]:
+    """Convert an ISBN-10 or ISBN-13 to its ISBN-13 digits.
+    """
+    isbn = re.sub(r'[^0-9X]', '', isbn.upper())
+    if len(isbn) == 10:
+        isbn = '978' + isbn[:9]
+        total = sum(
+            int(c) * (1 if i % 2 == 0 else 3) for i, c in enumerate(isbn))
+        isbn += str((10 - total % 10) % 10)
+    return isbn if len(isbn) == 13 else None
+
+
+def find_arxiv_id(text: str) -> Optional[str]:
+    """Search an unversioned arXiv identifier in a text, typically an
+    arxiv.org URL or an 'arXiv:YYMM.NNNNN' mention.
+    """
+    match = ARXIV_ID_PATTERN.search(text)
+    return None if match is None else match.group(1)
+
+
+class DuplicateIndex:
+
+    """Hash index of the papers seen so far, keyed by DOI, arXiv
+    identifier, ISBN and normalized title. Inserting and looking up a
+    paper are both O(1).
+
+    Papers are described by a dictionary following the Zotero item
+    'data' format, of which the 'itemType', 'title', 'DOI', 'ISBN',
+    'url', 'archiveID' and 'extra' fields are used.
+    """
+
+    def __init__(self):
+        self._index = {}
+
+    @staticmethod
+    def get_keys(data: Dict) -> List[Tuple[str, str]]:
+        keys = []
+
+        # URLs, eg of publishers or doi.org, often hold the DOI
+        for field in ['DOI', 'extra', 'url']:
+            doi = normalize_doi(data.get(field) or '')
+            if doi is not None:
+                keys.append(('DOI', doi))
+                break
+
+        for field in ['archiveID', 'url', 'extra']:
+            text = data.get(field) or ''
+            if field != 'archiveID' and 'arxiv' not in text.lower():
+                continue
+            arxiv_id = find_arxiv_id(text)
+            if arxiv_id is not None:
+                keys.append(('arXiv', arxiv_id))
+                break
+
+        # Papers of proceedings and book sections carry the ISBN of
+        # the whole volume, so only books are identified by their ISBN
+        isbns = (data.get('ISBN') or '').split() \
+            if data.get('itemType') == 'book' else []
+        for isbn in isbns:
+            isbn = normalize_isbn(isbn)
+            if isbn is not None:
+                keys.append(('ISBN', isbn))
+
+        title = normalize_title(data.get('title') or '')
+        if title:
+            keys.append(('title', title))
+
+        return keys
+
+    def find(self, data: Dict) -> Optional[Tuple[str, str]]:
+        """Return the first (kind, value) key under which the paper is
+        already indexed, or None if it is new.
+        """
+        for key in self.get_keys(data):
+            if key in self._index:
+                return key
+        return None
+
+    def add(self, data: Dict):
+        # Only the item key is kept, so that the index stays small even
+        # for large libraries
+        for key in self.get_keys(data):
+            self._index.setdefault(key, data.get('key'))
+
+    def __contains__(self, data: Dict):
+        return self.find(data) is not None
+
+    def __len__(self):
+        return len(self._index)
+
+    def __repr__(self):
+        return f"{self.__class__.__name__}({len(self)})"
@@ -0,0 +1,112 @@
+import json
+import time
+import threading
+from pathlib import Path
+
+
+__all__ = ['MigrationJournal']
+
+
+# Statuses of items which need not be uploaded again
+DONE_STATUSES = ['created', 'exists']
+
+
+class MigrationJournal:
+
+    """Append-only journal of the items uploaded to Notion, stored as
+    JSON lines in ~/.nora/journal/. Each line records the key and
+    version of an item, its upload status and the id of the created
+    Notion page. The last record of an item prevails.
+
+    This allows resuming an interrupted migration: items already
+    uploaded in their current version can be skipped without any
+    network call. Items whose page was created but whose notes were
+    not appended yet are recorded as 'partial', so that resuming only
+    appends their notes, see `get_partial`.
+
+    :param name: str
+        Name of the journal, typically identifying the source library
+        and the target Notion database
+    :param path: str
+        Path to the journal file. Overrides `name`
+    """
+
+    def __init__(self, name: str='zotero', path: str=None):
+        if path is None:
+            journal_dir = Path.home() / ".nora" / "journal"
+            journal_dir.mkdir(parents=True, exist_ok=True)
+            path = journal_dir / f"{name}.jsonl"
+        self.path = Path(path)
+        self.entries = {}
+        self._lock = threading.Lock()
+        self.load()
+        self._file = open(self.path, 'a')
+
+    def load(self):
+        if not self.path.exists():
+            return
+        with open(self.path, 'r') as f:
+            for line in f:
+                # The last line may be truncated if we crashed while
+                # writing it
+                try:
+                    entry = json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+                self.entries[entry['key']] = entry
+        self._truncate_partial_line()
+
+    def _truncate_partial_line(self):
+        """Drop the truncated last line left by a crash, if any, so that
+        the next record does not get appended to it.
+        """
+        with open(self.path, 'rb+') as f:
+            data = f.read()
+            if len(data) == 0 or data.endswith(b'\n'):
+                return
+            f.truncate(data.rfind(b'\n') + 1)
+
+    def is_done(self, key: str, version: int=None):
+        """Whether the item was successfully uploaded in this version.
+        """
+        entry = self.entries.get(key)
+        if entry is None:
+            return False
+        return entry['status'] in DONE_STATUSES \
+            and entry['version'] == version
+
+    def get_partial(self, key: str, version: int=None):
+        """Id of the page created for the item in this version, if its
+        notes could not be appended yet, None otherwise.
+        """
+        entry = self.entries.get(key)
+        if entry is None or entry['status'] != 'partial' \
+                or entry['version'] != version:
+            return None
+        return entry['page_id']
+
+    def record(
+            self,
+            key: str,
+            version: int=None,
+            status: str='created',
+            page_id: str=None):
+        entry = {
+            'key': key,
+            'version': version,
+            'status': status,
+            'page_id': page_id,
+            'time': time.strftime('%Y-%m-%dT%H:%M:%S')}
+        with self._lock:
+            self.entries[key] = entry
+            self._file.write(json.dumps(entry) + '\n')
+            self._file.flush()
+
+    def close(self):
+        self._file.close()
+
+    def __len__(self):
+        return len(self.entries)
+
+    def __repr__(self):
+        return f"{self.__class__.__name__}({self.path}, {len(self)})"
@@ -0,0 +1,120 @@
+import sqlite3
+import threading
+from pathlib import Path
+from typing import List, Dict, Optional
+
+
+__all__ = ['NotionMirror']
+
+
+MIRROR_DB = "notion.sqlite"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS pages (
+    page_id TEXT PRIMARY KEY,
+    database_id TEXT NOT NULL,
+    name TEXT,
+    norm_name TEXT,
+    url TEXT,
+    year INTEGER,
+    last_edited_time TEXT);
+CREATE INDEX IF NOT EXISTS pages_name ON pages (database_id, norm_name);
+CREATE TABLE IF NOT EXISTS syncs (
+    database_id TEXT PRIMARY KEY,
+    last_edited_time TEXT);
+"""
+
+
+class NotionMirror:
+
+    """Local SQLite copy of the page ids, titles and key properties of
+    the NoRA Notion databases, stored in ~/.nora/. Allows checking
+    whether a page exists without querying Notion.
+
+    The mirror is refreshed incrementally: only pages edited since the
+    last sync of a database need to be pulled from Notion.
+    """
+
+    def __init__(self, path: str=None):
+        if path is None:
+            config_dir = Path.home() / ".nora"
+            config_dir.mkdir(exist_ok=True)
+            path = config_dir / MIRROR_DB
+        self.path = Path(path)
+        self.connection = sqlite3.connect(
+            str(self.path), check_same_thread=False)
+        self.connection.executescript(SCHEMA)
+
+        # The connection may be shared by several threads, see
+        # AsyncNotionLibrary
+        self._lock = threading.RLock()
+
+    def is_synced(self, database_id: str):
+        """Whether the database has been synced at least once, in which
+        case the mirror is considered to hold all its pages.
+        """
+        with self._lock:
+            row = self.connection.execute(
+                "SELECT 1 FROM syncs WHERE database_id = ?",
+                (database_id,)).fetchone()
+        return row is not None
+
+    def last_sync(self, database_id: str) -> Optional[str]:
+        """Most recent `last_edited_time` seen for the database, or None
+        if it was never synced or is empty.
+        """
+        with self._lock:
+            row = self.connection.execute(
+                "SELECT last_edited_time FROM syncs WHERE database_id = ?",
+                (database_id,)).fetchone()
+        return None if row is None else row[0]
+
+    def set_last_sync(self, database_id: str, last_edited_time: str=None):
+        with self._lock, self.connection:
+            self.connection.execute(
+                "INSERT OR REPLACE INTO syncs VALUES (?, ?)",
+                (database_id, last_edited_time))
+
+    def upsert(self, rows: List[Dict]):
+        """Insert or update pages. Each row is expected to hold the
+        'page_id', 'database_id', 'name', 'norm_name', 'url', 'year'
+        and 'last_edited_time' keys.
+        """
+        with self._lock, self.connection:
+            self.connection.executemany(
+                "INSERT OR REPLACE INTO pages VALUES (:page_id, "
+                ":database_id, :name, :norm_name, :url, :year, "
+                ":last_edited_time)",
+                rows)
+
+    def clear(self, database_id: str):
+        """Remove all pages and sync information for a database.
+        """
+        with self._lock, self.connection:
+            self.connection.execute(
+                "DELETE FROM pages WHERE database_id = ?", (database_id,))
+            self.connection.execute(
+                "DELETE FROM syncs WHERE database_id = ?", (database_id,))
+
+    def get_page_id(self, database_id: str, norm_name: str) -> Optional[str]:
+        with self._lock:
+            row = self.connection.execute(
+                "SELECT page_id FROM pages WHERE database_id = ? AND "
+                "norm_name = ? LIMIT 1",
+                (database_id, norm_name)).fetchone()
+        return None if row is None else row[0]
+
+    def get_pages(self, database_id: str) -> List[Dict]:
+        with self._lock:
+            cursor = self.connection.execute(
+                "SELECT * FROM pages WHERE database_id = ?", (database_id,))
+            columns = [x[0] for x in cursor.description]
+            return [dict(zip(columns, row)) for row in cursor.fetchall()]
+
+    def __len__(self):
+        with self._lock:
+            return self.connection.execute(
+                "SELECT COUNT(*) FROM pages").fetchone()[0]
+
+    def __repr__(self):
+        return f"{self.__class__.__name__}({len(self)})"
@@ -0,0 +1,486 @@
+import re
+from html.parser import HTMLParser
+from typing import List, Dict, Tuple
+
+from mistletoe import Document
+from mistletoe import block_token, span_token
+from mistletoe.html_renderer import HtmlRenderer
+from notional.parser import HtmlParser
+
+
+__all__ = ['NotionBlockRenderer', 'markdown_to_blocks']
+
+
+# Annotations of the rich text, by span token
+SPAN_ANNOTATIONS = {
+    span_token.Strong: 'bold',
+    span_token.Emphasis: 'italic',
+    span_token.Strikethrough: 'strikethrough',
+    span_token.InlineCode: 'code'}
+
+# Annotations of the rich text, by HTML tag
+HTML_ANNOTATIONS = {
+    'strong': 'bold',
+    'b': 'bold',
+    'em': 'italic',
+    'i': 'italic',
+    'u': 'underline',
+    's': 'strikethrough',
+    'del': 'strikethrough',
+    'strike': 'strikethrough',
+    'code': 'code'}
+
+# HTML tags rendered like the Markdown tokens, which cover the notes
+# written in Zotero. Other tags are parsed by notional's HtmlParser
+HTML_BLOCK_TAGS = {
+    'div', 'p', 'h1', 'h2', 'h3', 'h4', 'h5', 'h6', 'ul', 'ol', 'li',
+    'blockquote', 'pre', 'hr'}
+HTML_SPAN_TAGS = {
+    'a', 'span', 'br', 'sub', 'sup', 'mark', *HTML_ANNOTATIONS}
+HTML_VOID_TAGS = {'br', 'hr'}
+
+
+class RawHtml(Exception):
+    """Raised when reaching raw HTML, which is not rendered from the
+    tokens, or HTML tags which are not rendered directly.
+    """
+    pass
+
+
+class HtmlElement:
+    """Element of an HTML tree, whose children are elements or text.
+    """
+
+    def __init__(self, tag: str, attrs: Dict=None):
+        self.tag = tag
+        self.attrs = attrs or {}
+        self.children = []
+
+    @property
+    def is_block(self) -> bool:
+        return self.tag in HTML_BLOCK_TAGS
+
+
+class HtmlTreeBuilder(HTMLParser):
+    """Parse HTML into a tree of HtmlElements, under a root 'div'.
+    Unclosed and stray closing tags are tolerated. Raise RawHtml on tags
+    which are not rendered directly, see `HTML_BLOCK_TAGS` and
+    `HTML_SPAN_TAGS`.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.root = HtmlElement('div')
+        self._stack = [self.root]
+
+    def handle_starttag(self, tag: str, attrs: List[Tuple]):
+        if tag not in HTML_BLOCK_TAGS and tag not in HTML_SPAN_TAGS:
+            raise RawHtml
+        element = HtmlElement(tag, dict(attrs))
+        self._stack[-1].children.append(element)
+        if tag not in HTML_VOID_TAGS:
+            self._stack.append(element)
+
+    def handle_endtag(self, tag: str):
+        for i in range(len(self._stack) - 1, 0, -1):
+            if self._stack[i].tag == tag:
+                del self._stack[i:]
+                return
+
+    def handle_data(self, data: str):
+        self._stack[-1].children.append(data)
+
+    @classmethod
+    def parse(cls, html: str) -> HtmlElement:
+        builder = cls()
+        builder.feed(html)
+        builder.close()
+        return builder.root
+
+
+class NotionBlockRenderer(HtmlRenderer):
+
+    """Render Markdown straight from the mistletoe token tree to the
+    JSON blocks of the Notion API, in a single traversal.
+
+    The Notion API only supports a limited depth of nested blocks, so
+    the blocks nested beyond `max_depth` are flattened into the text of
+    their parent, as they are reached.
+
+    Top-level blocks holding raw HTML, such as the notes written in
+    Zotero, are parsed into HtmlElements, which are rendered like the
+    tokens. Only HTML holding other tags than those of Zotero notes is
+    parsed with notional's HtmlParser instead.
+
+    Use as a context manager, like any mistletoe renderer, or see
+    `markdown_to_blocks`.
+
+    :param max_depth: int
+        Depth beyond which nested blocks are flattened
+    :param marker: str
+        Marker preceding each flattened block, repeated once per level
+    """
+
+    def __init__(self, max_depth: int=2, marker: str='•'):
+        super().__init__()
+        self.max_depth = max_depth
+        self.marker = marker
+
+    def render_document(self, token: block_token.Document) -> List[Dict]:
+        self.footnotes.update(token.footnotes)
+        blocks = []
+        for child in token.children:
+            try:
+                blocks += self._blocks(child, depth=0)
+            except RawHtml:
+                blocks += self._html_blocks(child)
+        return blocks
+
+    def _units(self, token) -> List[Tuple[str, List[Dict], List]]:
+        """Split a block token into the Notion blocks it renders to, as
+        (block type, rich text, nested block tokens) tuples. Tables are
+        split into one paragraph per row here, for when they are nested
+        too deep to hold their rows, see `_blocks`.
+        """
+        if isinstance(token, HtmlElement):
+            return self._html_units(token)
+
+        if isinstance(token, (block_token.Heading,
+                              block_token.SetextHeading)):
+            block_type = f"heading_{min(token.level, 3)}"
+            return [(block_type, self._rich_text(token.children), [])]
+
+        if isinstance(token, (block_token.CodeFence,
+                              block_token.BlockCode)):
+            text = token.children[0].content if token.children else ''
+            return [('code', [self._text(text)], [])]
+
+        if isinstance(token, block_token.ThematicBreak):
+            return [('divider', [], [])]
+
+        if isinstance(token, block_token.List):
+            block_type = 'bulleted_list_item' if token.start is None \
+                else 'numbered_list_item'
+            return [
+                (block_type, *self._split_first_paragraph(item.children))
+                for item in token.children]
+
+        if isinstance(token, block_token.Quote):
+            return [('quote', *self._split_first_paragraph(token.children))]
+
+        if isinstance(token, block_token.Paragraph):
+            return [('paragraph', self._rich_text(token.children), [])]
+
+        if isinstance(token, block_token.Table):
+            return [
+                ('paragraph', self._row_text(row), [])
+                for row in self._table_rows(token)]
+
+        if isinstance(token, block_token.HtmlBlock):
+            raise RawHtml
+
+        return []
+
+    def _split_first_paragraph(self, children: List) -> Tuple[List, List]:
+        """The first paragraph of list items and quotes is their text,
+        the next blocks their children.
+        """
+        children = list(children or [])
+        if children and (
+                isinstance(children[0], block_token.Paragraph)
+                or getattr(children[0], 'tag', None) == 'p'):
+            return self._rich_text(children[0].children), children[1:]
+        return [], children
+
+    def _html_units(self, element: HtmlElement) -> List[Tuple]:
+        """Counterpart of `_units` for HtmlElements.
+        """
+        tag = element.tag
+        if re.fullmatch(r'h[1-6]', tag):
+            block_type = f"heading_{min(int(tag[1]), 3)}"
+            return [(block_type, self._rich_text(element.children), [])]
+
+        if tag == 'pre':
+            return [('code', [self._text(self._html_text(element))], [])]
+
+        if tag == 'hr':
+            return [('divider', [], [])]
+
+        if tag in ['ul', 'ol']:
+            block_type = 'bulleted_list_item' if tag == 'ul' \
+                else 'numbered_list_item'
+            units = []
+            for child in self._html_blocks_of(element.children):
+                if child.tag != 'li':
+                    units += self._html_units(child)
+                    continue
+                units.append((block_type, *self._split_first_paragraph(
+                    self._html_blocks_of(child.children))))
+            return units
+
+        if tag in ['li', 'blockquote']:
+            block_type = 'quote' if tag == 'blockquote' \
+                else 'bulleted_list_item'
+            return [(block_type, *self._split_first_paragraph(
+                self._html_blocks_of(element.children)))]
+
+        if tag == 'p':
+            return [('paragraph', self._rich_text(element.children), [])]
+
+        # Containers, eg the 'div' wrapping Zotero notes
+        return [
+            unit for child in self._html_blocks_of(element.children)
+            for unit in self._html_units(child)]
+
+    @staticmethod
+    def _html_blocks_of(children: List) -> List[HtmlElement]:
+        """Block elements among the children of an element. Runs of
+        text and span elements between them are wrapped in paragraphs.
+        """
+        blocks = []
+        run = []
+        for child in children + [None]:
+            if child is not None \
+                    and not getattr(child, 'is_block', False):
+                run.append(child)
+                continue
+            if any(not isinstance(x, str) or x.strip() for x in run):
+                paragraph = HtmlElement('p')
+                paragraph.children = run
+                blocks.append(paragraph)
+            run = []
+            if child is not None:
+                blocks.append(child)
+        return blocks
+
+    def _html_text(self, element: HtmlElement) -> str:
+        """Text of an element, with its whitespace preserved.
+        """
+        return ''.join(
+            child if isinstance(child, str)
+            else '\n' if child.tag == 'br' else self._html_text(child)
+            for child in element.children)
+
+    def _blocks(self, token, depth: int) -> List[Dict]:
+        # Table rows are nested blocks, so tables at the maximum depth
+        # are flattened like the other nested blocks
+        if isinstance(token, block_token.Table) and depth < self.max_depth:
+            return [self._table(token)]
+
+        blocks = []
+        for block_type, rich_text, children in self._units(token):
+            if block_type == 'divider':
+                blocks.append(self._block(block_type, {}))
+                continue
+
+            content = {'rich_text': rich_text}
+            if block_type == 'code':
+                content['language'] = 'plain text'
+            else:
+                content['color'] = 'default'
+
+            # Flatten the nested blocks right away, beyond the maximum
+            # depth, rather than rendering them first
+            if children and depth >= self.max_depth:
+                rich_text.append(self._text(self._flatten(children, 1)))
+            elif children:
+                content['children'] = [
+                    block for child in children
+                    for block in self._blocks(child, depth + 1)]
+
+            blocks.append(self._block(block_type, content))
+        return blocks
+
+    @staticmethod
+    def _block(block_type: str, content: Dict) -> Dict:
+        return {
+            'object': 'block',
+            'type': block_type,
+            'has_children': len(content.get('children', [])) > 0,
+            block_type: content}
+
+    def _flatten(self, tokens: List, level: int) -> str:
+        """Text of nested block tokens, each preceded by `level`
+        markers, and their own nested blocks by `level + 1` markers.
+        """
+        parts = [' ( ']
+        for token in tokens:
+            for _, rich_text, children in self._units(token):
+                text = ''.join(x['text']['content'] for x in rich_text)
+                parts.append(f" {self.marker * level} {text}")
+                if children:
+                    parts.append(self._flatten(children, level + 1))
+        parts.append(' ) ')
+        return ''.join(parts)
+
+    @staticmethod
+    def _table_rows(token: block_token.Table) -> List:
+        rows = [token.header] if token.header is not None else []
+        return rows + list(token.children)
+
+    def _row_text(self, row) -> List[Dict]:
+        """Rich text of a table row, its cells separated by ' | '.
+        """
+        rich_text = []
+        for i, cell in enumerate(row.children):
+            if i > 0:
+                rich_text.append(self._text(' | '))
+            rich_text += self._rich_text(cell.children)
+        return rich_text
+
+    def _table(self, token: block_token.Table) -> Dict:
+        rows = self._table_rows(token)
+        width = max((len(row.children) for row in rows), default=0)
+        children = [
+            self._block('table_row', {'cells': [
+                self._rich_text(cell.children) for cell in row.children]})
+            for row in rows]
+        return self._block('table', {
+            'table_width': width,
+            'has_column_header': token.header is not None,
+            'has_row_header': False,
+            'children': children})
+
+    def _rich_text(
+            self,
+            tokens: List,
+            annotations: Dict=None,
+            link: str=None,
+            rich_text: List[Dict]=None) -> List[Dict]:
+        """Rich text of span tokens. Consecutive runs of text with the
+        same style are merged, and the text is stripped.
+        """
+        top = rich_text is None
+        rich_text = [] if top else rich_text
+        annotations = annotations or {}
+
+        for token in tokens or []:
+            if isinstance(token, span_token.RawText):
+                self._append_text(rich_text, token.content, annotations, link)
+            elif isinstance(token, span_token.LineBreak):
+                text = ' ' if token.soft else '\n'
+                self._append_text(rich_text, text, annotations, link)
+            elif isinstance(token, (span_token.Link, span_token.AutoLink)):
+                self._rich_text(
+                    token.children, annotations, token.target, rich_text)
+            elif isinstance(token, span_token.Image):
+                # Images cannot be part of a text block, link to them
+                children = token.children or [span_token.RawText(token.src)]
+                self._rich_text(children, annotations, token.src, rich_text)
+            elif isinstance(token, span_token.HtmlSpan):
+                raise RawHtml
+            elif isinstance(token, str):
+                # Text of HtmlElements, whose whitespace is collapsed
+                text = re.sub(r'\s+', ' ', token)
+                self._append_text(rich_text, text, annotations, link)
+            elif isinstance(token, HtmlElement):
+                if token.tag == 'br':
+                    self._append_text(rich_text, '\n', annotations, link)
+                    continue
+                style = annotations
+                if token.tag in HTML_ANNOTATIONS:
+                    style = {
+                        **annotations, HTML_ANNOTATIONS[token.tag]: True}
+                href = token.attrs.get('href') if token.tag == 'a' \
+                    else None
+                self._rich_text(
+                    token.children, style, href or link, rich_text)
+            elif type(token) in SPAN_ANNOTATIONS:
+                style = {**annotations, SPAN_ANNOTATIONS[type(token)]: True}
+                self._rich_text(token.children, style, link, rich_text)
+            else:
+                self._rich_text(
+                    getattr(token, 'children', None), annotations, link,
+                    rich_text)
+
+        if top and rich_text:
+            first, last = rich_text[0]['text'], rich_text[-1]['text']
+            first['content'] = first['content'].lstrip()
+            last['content'] = last['content'].rstrip()
+            rich_text = [x for x in rich_text if x['text']['content']]
+        return rich_text
+
+    def _append_text(
+            self,
+            rich_text: List[Dict],
+            text: str,
+            annotations: Dict,
+            link: str):
+        if not text:
+            return
+        previous = rich_text[-1] if rich_text else None
+        if previous is not None \
+                and previous.get('annotations', {}) == annotations \
+                and previous['text'].get('link', {}).get('url') == link:
+            previous['text']['content'] += text
+            return
+        rich_text.append(self._text(text, annotations, link))
+
+    @staticmethod
+    def _text(text: str, annotations: Dict=None, link: str=None) -> Dict:
+        obj = {'type': 'text', 'text': {'content': text}}
+        if link is not None:
+            obj['text']['link'] = {'url': link}
+        if annotations:
+            obj['annotations'] = dict(annotations)
+        return obj
+
+    def _html_blocks(self, token) -> List[Dict]:
+        """Blocks of a top-level token holding raw HTML, rendered to
+        HTML and parsed into HtmlElements. HTML holding other tags than
+        those of Zotero notes is parsed with HtmlParser instead.
+        """
+        html = self.render(token)
+        try:
+            return self._blocks(HtmlTreeBuilder.parse(html), depth=0)
+        except RawHtml:
+            pass
+
+        parser = HtmlParser()
+        parser.parse(html)
+        blocks = [x.dict() for x in parser.content]
+        self._limit_depth(blocks, depth=0)
+        return blocks
+
+    def _limit_depth(self, blocks: List[Dict], depth: int):
+        """Flatten, in place, the blocks nested beyond the maximum depth
+        in blocks already built by HtmlParser.
+        """
+        for block in blocks:
+            content = block[block['type']]
+            children = content.get('children')
+            if not children:
+                continue
+            if depth < self.max_depth:
+                self._limit_depth(children, depth + 1)
+                continue
+            content['rich_text'].append(
+                self._text(self._flatten_blocks(children, 1)))
+            block['has_children'] = False
+            del content['children']
+
+    def _flatten_blocks(self, blocks: List[Dict], level: int) -> str:
+        """Counterpart of `_flatten` for blocks built by HtmlParser.
+        """
+        parts = [' ( ']
+        for block in blocks:
+            content = block[block['type']]
+            text = ''.join(
+                x['text']['content'] for x in content.get('rich_text', []))
+            parts.append(f" {self.marker * level} {text}")
+            if content.get('children'):
+                parts.append(
+                    self._flatten_blocks(content['children'], level + 1))
+        parts.append(' ) ')
+        return ''.join(parts)
+
+
+def markdown_to_blocks(
+        text: str,
+        max_depth: int=2,
+        marker: str='•') -> List[Dict]:
+    """Convert Markdown text, possibly holding raw HTML, to the JSON
+    blocks of the Notion API. See `NotionBlockRenderer`.
+    """
+    with NotionBlockRenderer(max_depth=max_depth, marker=marker) as renderer:
+        return renderer.render(Document(text))
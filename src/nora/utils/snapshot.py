@@ -0,0 +1,164 @@
+import os
+import json
+import requests
+from pathlib import Path
+from pyzotero import zotero
+
+
+__all__ = ['ZoteroSnapshot']
+
+
+ZOTERO_API = "https://api.zotero.org"
+
+# Attributes saved in the snapshot file
+SNAPSHOT_KEYS = ['version', 'items', 'collections', 'notes']
+
+
+class ZoteroSnapshot:
+
+    """Local copy of the top-level items, collections and notes of a
+    Zotero library, stored as JSON in ~/.nora/zotero/ and tagged with
+    the library version it reflects.
+
+    Refreshing the snapshot first asks Zotero whether the library
+    changed since that version, using a conditional request which
+    returns 304 if it did not. If it did, only the objects modified
+    since then are downloaded and merged, and the deleted ones are
+    dropped. See:
+    https://www.zotero.org/support/dev/web_api/v3/syncing
+
+    :param library: zotero.Zotero
+        pyzotero client of the library
+    :param path: str
+        Path to the snapshot file. Defaults to
+        ~/.nora/zotero/<library_id>.json
+    """
+
+    def __init__(self, library: zotero.Zotero, path: str=None):
+        if path is None:
+            snapshot_dir = Path.home() / ".nora" / "zotero"
+            snapshot_dir.mkdir(parents=True, exist_ok=True)
+            path = snapshot_dir / f"{library.library_id}.json"
+        self.library = library
+        self.path = Path(path)
+        self.version = None
+        self.items = {}
+        self.collections = {}
+        self.notes = {}
+        self.load()
+
+    def load(self):
+        if not self.path.exists():
+            return
+        with open(self.path, 'r') as f:
+            data = json.load(f)
+
+        # Snapshots missing some objects, eg written by an older NoRA
+        # version, are discarded and rebuilt from scratch
+        if any(k not in data for k in SNAPSHOT_KEYS):
+            return
+
+        self.version = data['version']
+        self.items = data['items']
+        self.collections = data['collections']
+        self.notes = data['notes']
+
+    def save(self):
+        # Write to a temporary file first, so an interruption never
+        # leaves a corrupted snapshot behind
+        data = {k: getattr(self, k) for k in SNAPSHOT_KEYS}
+        tmp_path = self.path.with_suffix('.tmp')
+        with open(tmp_path, 'w') as f:
+            json.dump(data, f)
+        os.replace(tmp_path, self.path)
+
+    def get_remote_version(self):
+        """Return the current version of the remote library, or None if
+        it did not change since the snapshot version.
+        """
+        url = f"{ZOTERO_API}/{self.library.library_type}/" \
+              f"{self.library.library_id}/items"
+        headers = {
+            'Zotero-API-Version': '3',
+            'Zotero-API-Key': self.library.api_key}
+        if self.version is not None:
+            headers['If-Modified-Since-Version'] = str(self.version)
+        response = requests.get(
+            url,
+            params={'limit': 1, 'format': 'versions'},
+            headers=headers,
+            timeout=30)
+        if response.status_code == 304:
+            return None
+        response.raise_for_status()
+        return int(response.headers['Last-Modified-Version'])
+
+    def refresh(self, verbose: bool=False):
+        """Bring the snapshot up to date with the remote library.
+        """
+        version = self.get_remote_version()
+        if version is None:
+            if verbose:
+                print(f"Library unchanged since version {self.version}")
+            return
+
+        if self.version is None:
+            if verbose:
+                print("Downloading the whole library...")
+            self.items = {
+                item['key']: item
+                for item in self.library.everything(self.library.top())}
+            self.collections = {
+                collection['key']: collection
+                for collection in self.library.everything(
+                    self.library.collections())}
+            self.notes = {
+                note['key']: note
+                for note in self.library.everything(
+                    self.library.items(itemType='note'))}
+        else:
+            if verbose:
+                print(f"Downloading changes since version {self.version}...")
+            self._merge(self.version)
+
+        self.version = version
+        self.save()
+
+    def _merge(self, since: int):
+        # Trashed items are requested too, so that items moved to the
+        # trash since the last refresh are dropped from the snapshot
+        changed = self.library.everything(
+            self.library.top(since=since, includeTrashed=1))
+        for item in changed:
+            if item['data'].get('deleted'):
+                self.items.pop(item['key'], None)
+            else:
+                self.items[item['key']] = item
+
+        changed = self.library.everything(
+            self.library.items(itemType='note', since=since, includeTrashed=1))
+        for note in changed:
+            if note['data'].get('deleted'):
+                self.notes.pop(note['key'], None)
+            else:
+                self.notes[note['key']] = note
+
+        changed = self.library.everything(
+            self.library.collections(since=since))
+        for collection in changed:
+            self.collections[collection['key']] = collection
+
+        deleted = self.library.deleted(since=since)
+        for key in deleted.get('items', []):
+            self.items.pop(key, None)
+            self.notes.pop(key, None)
+        for key in deleted.get('collections', []):
+            self.collections.pop(key, None)
+
+    def __len__(self):
+        return len(self.items)
+
+    def __repr__(self):
+        return f"{self.__class__.__name__}(version={self.version}, " \
+               f"items={len(self)}, collections={len(self.collections)}, " \
+               f"notes={len(self.notes)})"
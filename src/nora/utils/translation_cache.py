@@ -0,0 +1,172 @@
+import re
+import json
+import time
+import sqlite3
+import threading
+from pathlib import Path
+from typing import Dict, Optional
+from urllib.parse import urlsplit, urlunsplit, parse_qsl, urlencode
+from nora.utils.dedup import normalize_doi, normalize_isbn, find_arxiv_id
+
+
+__all__ = ['TranslationCache', 'normalize_query']
+
+
+CACHE_DB = "translation_cache.sqlite"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS translations (
+    key TEXT PRIMARY KEY,
+    data TEXT NOT NULL,
+    created REAL NOT NULL,
+    accessed REAL NOT NULL);
+CREATE INDEX IF NOT EXISTS translations_accessed ON translations (accessed);
+"""
+
+# Query parameters added to URLs for tracking purposes, which do not
+# change the page they point to
+TRACKING_PARAMS = re.compile(
+    r'^(utm_\w+|fbclid|gclid|dclid|msclkid|mc_cid|mc_eid|_hsenc|_hsmi'
+    r'|ref_src)$',
+    re.IGNORECASE)
+
+DOI_HOSTS = ['doi.org', 'dx.doi.org']
+
+
+def normalize_query(query: str) -> str:
+    """Map the various spellings of a URL or identifier to the same
+    key. DOIs are lowercased, arXiv identifiers lose their version
+    suffix and URLs lose their fragment and tracking parameters.
+
+    Only doi.org and arxiv.org URLs are reduced to their identifier:
+    other pages holding the same paper may yield different metadata.
+    """
+    query = query.strip()
+    parts = urlsplit(query)
+
+    if parts.scheme in ['http', 'https'] and parts.netloc:
+        host = parts.netloc.lower()
+        if host.startswith('www.'):
+            host = host[4:]
+
+        if host in DOI_HOSTS:
+            doi = normalize_doi(parts.path.lstrip('/'))
+            if doi is not None:
+                return f"doi:{doi}"
+
+        if host == 'arxiv.org' or host.endswith('.arxiv.org'):
+            arxiv_id = find_arxiv_id(parts.path)
+            if arxiv_id is not None:
+                return f"arxiv:{arxiv_id}"
+
+        params = sorted(
+            (k, v) for k, v in parse_qsl(parts.query, keep_blank_values=True)
+            if not TRACKING_PARAMS.match(k))
+        path = parts.path.rstrip('/') or '/'
+        return urlunsplit(('https', host, path, urlencode(params), ''))
+
+    if query.lower().startswith('doi:'):
+        query = query[4:].strip()
+    doi = normalize_doi(query)
+    if doi is not None and query.lower().startswith('10.'):
+        return f"doi:{doi}"
+
+    if query.lower().startswith('arxiv:'):
+        query = query[6:].strip()
+    arxiv_id = find_arxiv_id(query)
+    if arxiv_id is not None and re.fullmatch(r'[\d.]+(v\d+)?', query):
+        return f"arxiv:{arxiv_id}"
+
+    isbn = normalize_isbn(query) if re.fullmatch(r'[\d\- X]+', query) \
+        else None
+    if isbn is not None:
+        return f"isbn:{isbn}"
+
+    return ' '.join(query.lower().split())
+
+
+class TranslationCache:
+
+    """Local SQLite cache of the metadata returned by the translation
+    server, stored in ~/.nora/. Entries are keyed by endpoint and
+    normalized query, see `normalize_query`.
+
+    :param path: str
+        Path to the cache file. Defaults to
+        ~/.nora/translation_cache.sqlite
+    :param ttl: float
+        Number of days after which an entry expires. Entries never
+        expire if None or 0
+    :param max_entries: int
+        Maximum number of entries. The least recently used ones are
+        evicted beyond that
+    """
+
+    def __init__(
+            self,
+            path: str=None,
+            ttl: float=30,
+            max_entries: int=10000):
+        if path is None:
+            config_dir = Path.home() / ".nora"
+            config_dir.mkdir(exist_ok=True)
+            path = config_dir / CACHE_DB
+        self.path = Path(path)
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.connection = sqlite3.connect(
+            str(self.path), check_same_thread=False)
+        self.connection.executescript(SCHEMA)
+
+        # The connection may be shared by several threads, see
+        # `translate_from_urls`
+        self._lock = threading.RLock()
+
+    @staticmethod
+    def get_key(endpoint: str, query: str) -> str:
+        return f"{endpoint}:{normalize_query(query)}"
+
+    def get(self, endpoint: str, query: str) -> Optional[Dict]:
+        key = self.get_key(endpoint, query)
+        now = time.time()
+        with self._lock, self.connection:
+            row = self.connection.execute(
+                "SELECT data, created FROM translations WHERE key = ?",
+                (key,)).fetchone()
+            if row is None:
+                return None
+            data, created = row
+            if self.ttl and now - created > self.ttl * 86400:
+                self.connection.execute(
+                    "DELETE FROM translations WHERE key = ?", (key,))
+                return None
+            self.connection.execute(
+                "UPDATE translations SET accessed = ? WHERE key = ?",
+                (now, key))
+        return json.loads(data)
+
+    def set(self, endpoint: str, query: str, data: Dict):
+        key = self.get_key(endpoint, query)
+        now = time.time()
+        with self._lock, self.connection:
+            self.connection.execute(
+                "INSERT OR REPLACE INTO translations VALUES (?, ?, ?, ?)",
+                (key, json.dumps(data), now, now))
+            if self.max_entries:
+                self.connection.execute(
+                    "DELETE FROM translations WHERE key IN (SELECT key "
+                    "FROM translations ORDER BY accessed DESC LIMIT -1 "
+                    "OFFSET ?)",
+                    (self.max_entries,))
+
+    def clear(self):
+        with self._lock, self.connection:
+            self.connection.execute("DELETE FROM translations")
+
+    def __len__(self):
+        with self._lock:
+            return self.connection.execute(
+                "SELECT COUNT(*) FROM translations").fetchone()[0]
+
+    def __repr__(self):
+        return f"{self.__class__.__name__}({len(self)})"
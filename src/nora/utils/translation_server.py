@@ -2,53 +2,74 @@ import os
 import sys
 import json
 import time
-import psutil
+import fcntl
 import signal
 import subprocess
 import socket
 import atexit
-import platform
+import requests
+import threading
+from pathlib import Path
 from os.path import dirname
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor
 from typing import Union, List, Dict
+from nora.utils.transport import Transport
+from nora.utils.translation_cache import TranslationCache
+
+__all__ = [
+    'configure_server',
+    'start_daemon',
+    'stop_daemon',
+    'daemon_status',
+    'translate_from_url',
+    'translate_from_urls',
+    'translate_from_identifier',
+    'TranslationError']
+
+SERVER_HOST = "http://127.0.0.1"
+SERVER_PORT = 1969
 
-__all__ = ['translate_from_url', 'translate_from_identifier']
+# Files of the daemon, in ~/.nora/translation_server/
+PIDFILE = "daemon.pid"
+LOCKFILE = "daemon.lock"
 
-SERVER_PORT = 1969
-SERVER_IP = f"http://127.0.0.1:{SERVER_PORT}"
-PING_URL = f"{SERVER_IP}/connector/ping"
+# Ports of the translation server workers, see `configure_server`
+_server_ports = [SERVER_PORT]
 
-# Global server process (singleton pattern)
-_translation_process = None
+# Global server processes, by port (singleton pattern)
+_translation_processes = {}
 
+# Ports on which a server we did not start is already running
+_external_ports = set()
 
-# ------------------------------
-# Utility Functions
-# ------------------------------
+# Seconds during which workers found alive are not checked again, see
+# `start_server`
+WORKER_CHECK_TTL = 5
+_workers_checked_at = None
 
-def get_pid_using_port_unix(port: Union[str, int]):
-    """Recover the PID of the process using a given port."""
-    for con in psutil.net_connections():
-        if con.laddr and con.laddr.port == port:
-            return con.pid
-        if con.raddr and con.raddr.port == port:
-            return con.pid
-    return -1
+# Number of requests in flight, by port
+_pending_requests = {}
+_pool_lock = threading.Lock()
+_start_lock = threading.RLock()
 
+# Global HTTP client to the server (singleton pattern)
+_translation_client = None
 
-def get_pid_using_port_osx(port: Union[str, int]):
-    try:
-        out = subprocess.check_output(['lsof', '-ti', f':{port}'])
-        pids = [int(p) for p in out.decode().split()]
-        return pids[0] if pids else -1
-    except subprocess.CalledProcessError:
-        return -1
+# Cache of the translated metadata, see `configure_server`
+_cache_settings = {'enabled': True, 'ttl': 30, 'max_entries': 10000}
+_translation_cache = None
 
 
-def get_pid_using_port(port: Union[str, int]):
-    if platform.system() == "Darwin":
-        return get_pid_using_port_osx(port)
-    else:
-        return get_pid_using_port_unix(port)
+class TranslationError(Exception):
+    """Raised when the metadata of a query could not be translated.
+    """
+    pass
+
+
+# ------------------------------
+# Utility Functions
+# ------------------------------
 
 def is_port_open(port: Union[str, int]):
     """True if something is listening on the port."""
@@ -56,56 +77,233 @@ def is_port_open(port: Union[str, int]):
         return s.connect_ex(("127.0.0.1", port)) == 0
 
 
-def ping_server(timeout: float=0.5):
+def get_client():
+    """Return the HTTP client to the translation server. Connections
+    are kept alive across requests. The server is local, so requests
+    are neither rate-limited nor retried.
+    """
+    global _translation_client
+    if _translation_client is None:
+        _translation_client = Transport(pool_size=4, timeout=20)
+    return _translation_client
+
+
+def get_server_url(port: int=SERVER_PORT):
+    return f"{SERVER_HOST}:{port}"
+
+
+def ping_server(port: int=SERVER_PORT, timeout: float=0.5):
     """Return True if the server responds *in any way* to /connector/ping."""
     try:
-        out = subprocess.check_output([
-            'curl', '-m', str(timeout), '-s', '-o', '/dev/null', '-w', '%{http_code}',
-            PING_URL
-        ])
-        status = out.decode().strip()
-        return status.isdigit()  # 200, 404, etc. — anything is good
-    except subprocess.CalledProcessError:
+        get_client().get(
+            f"{get_server_url(port)}/connector/ping", timeout=timeout)
+    except requests.RequestException:
         return False
+    return True  # 200, 404, etc. — anything is good
 
 
 # ------------------------------
 # Server Lifecycle Management
 # ------------------------------
 
+def configure_server(
+        port: int=SERVER_PORT,
+        workers: int=1,
+        cache: bool=True,
+        cache_ttl: float=30,
+        cache_size: int=10000):
+    """Run the translation server as a pool of `workers` processes,
+    listening on consecutive ports starting from `port`. Requests are
+    sent to the least busy worker. This must be called before the
+    server is started.
+
+    Translated metadata is cached in ~/.nora/ for `cache_ttl` days, up
+    to `cache_size` entries, unless `cache` is False.
+    """
+    global _server_ports, _translation_cache, _workers_checked_at
+    _server_ports = list(range(port, port + max(1, workers)))
+    _workers_checked_at = None
+    _cache_settings.update(
+        enabled=cache, ttl=cache_ttl, max_entries=cache_size)
+    _translation_cache = None
+
+
+def get_cache():
+    """Return the translation cache, or None if disabled.
+    """
+    global _translation_cache
+    if not _cache_settings['enabled']:
+        return None
+    if _translation_cache is None:
+        _translation_cache = TranslationCache(
+            ttl=_cache_settings['ttl'],
+            max_entries=_cache_settings['max_entries'])
+    return _translation_cache
+
+
 def start_server(patience: float=10, timestep: float=0.25):
     """
-    Start the translation server only if not already running.
-    Wait until it's *actually responding*, not just bound to port.
+    Start the translation server workers not already running, and
+    restart those which died. Wait until they are *actually
+    responding*, not just bound to their port.
+
+    If the daemon is running (see `start_daemon`), requests are sent to
+    its workers instead, and its dead workers are restarted detached.
+
+    This runs before each request, so workers found alive are not
+    checked again for `WORKER_CHECK_TTL` seconds, unless a request
+    fails to reach them, see `forget_worker_check`.
+    """
+    global _server_ports, _workers_checked_at
+
+    with _start_lock:
+        if _workers_checked_at is not None \
+                and time.monotonic() - _workers_checked_at < WORKER_CHECK_TTL:
+            return
+
+        daemon_pids = read_pidfile()
+        if len(daemon_pids) > 0:
+            _server_ports = sorted(daemon_pids)
+
+        ports = []
+        dead_daemon_ports = []
+        for port in _server_ports:
+            if port in daemon_pids:
+                if not is_worker_alive(port, daemon_pids[port]):
+                    dead_daemon_ports.append(port)
+                continue
+            process = _translation_processes.get(port)
+            if process is not None and process.poll() is None:
+                continue
+            if process is None and is_port_open(port):
+                if port not in _external_ports:
+                    print(
+                        f"ℹ️ Translation server already running on port "
+                        f"{port}.")
+                    _external_ports.add(port)
+                continue
+            if process is not None:
+                print(f"⚠️ Translation server on port {port} died.")
+            _external_ports.discard(port)
+            ports.append(port)
+
+        if len(ports) > 0:
+            # Check that the node version is at most 20
+            check_node_version()
+
+            processes = {port: start_worker(port) for port in ports}
+            wait_for_workers(
+                processes, patience=patience, timestep=timestep)
+
+        if len(dead_daemon_ports) > 0:
+            restart_daemon_workers(
+                dead_daemon_ports, patience=patience, timestep=timestep)
+
+        _workers_checked_at = time.monotonic()
+
+
+def restart_daemon_workers(
+        ports: List[int],
+        patience: float=10,
+        timestep: float=0.25):
+    """Restart, detached, the daemon workers which died on the given
+    ports. This holds the pidfile lock, so that NoRA commands sharing
+    the daemon do not restart the same worker twice. Workers which
+    another command restarted in the meantime are left as they are.
+    """
+    with pidfile_lock():
+        pids = read_pidfile()
+        ports = [
+            port for port in ports
+            if port in pids and not is_worker_alive(port, pids[port])]
+        if len(ports) == 0:
+            return
+
+        for port in ports:
+            print(f"⚠️ Translation server on port {port} died.")
+
+        # Check that the node version is at most 20
+        check_node_version()
+
+        processes = {port: start_worker(port, detach=True) for port in ports}
+        wait_for_workers(processes, patience=patience, timestep=timestep)
+        write_pidfile({**pids, **{p: x.pid for p, x in processes.items()}})
+
+
+def forget_worker_check():
+    """Have the next `start_server` check the workers again, eg after
+    a request failed to reach one of them.
     """
-    global _translation_process
+    global _workers_checked_at
+    with _start_lock:
+        _workers_checked_at = None
 
-    if is_port_open(SERVER_PORT):
-        print(f"ℹ️ Translation server already running on port {SERVER_PORT}.")
-        return
 
-    print(f"🔄 Starting translation server on port {SERVER_PORT}...")
+def start_worker(port: int=SERVER_PORT, detach: bool=False):
+    """Launch a translation server process on the given port, without
+    waiting for it to be ready.
+
+    Attached workers are killed when we exit. Detached workers run in
+    their own session and log to ~/.nora/translation_server/, so that
+    they outlive us.
+    """
+    print(f"🔄 Starting translation server on port {port}...")
 
-    # Kill any stale process bound to port before launching new
-    kill_pid_using_port(SERVER_PORT)
+    # Stop what remains of a previous worker on this port, eg children
+    # of a dead server
+    process = _translation_processes.pop(port, None)
+    if process is not None:
+        try:
+            os.killpg(process.pid, signal.SIGTERM)
+        except ProcessLookupError:
+            pass
 
-    # Check that the node version is at most 20
-    check_node_version()
+    # The server reads its settings with node-config, which lets the
+    # NODE_CONFIG environment variable override the default port
+    env = {**os.environ, 'NODE_CONFIG': json.dumps({'port': port})}
 
     server_path = os.path.join(dirname(dirname(__file__)), 'translation_server')
-    _translation_process = subprocess.Popen(
+    if detach:
+        with open(get_log_path(port), 'wb') as log:
+            return subprocess.Popen(
+                ['node', 'src/server.js'],
+                stdin=subprocess.DEVNULL,
+                stdout=log,
+                stderr=subprocess.STDOUT,
+                cwd=server_path,
+                env=env,
+                start_new_session=True
+            )
+
+    process = subprocess.Popen(
         ['node', 'src/server.js'],
         stdout=subprocess.PIPE,
         stderr=subprocess.PIPE,
         cwd=server_path,
+        env=env,
         preexec_fn=os.setsid
     )
+    _translation_processes[port] = process
+    return process
 
+
+def wait_for_workers(
+        processes: Dict[int, subprocess.Popen],
+        patience: float=10,
+        timestep: float=0.25):
+    """Wait for freshly started workers, indexed by port, to respond.
+    Exit with their logs if they are not ready within `patience`
+    seconds.
+    """
     # Wait for port binding + ping success
+    ports = list(processes)
     start = time.time()
     print("⏳ Waiting for server to become ready", end="", flush=True)
     while time.time() - start < patience:
-        if is_port_open(SERVER_PORT) and ping_server():
+        ports = [
+            p for p in ports
+            if not (is_port_open(p) and ping_server(port=p))]
+        if len(ports) == 0:
             print("\n✅ Server is ready!")
             return
         print(".", end="", flush=True)
@@ -113,49 +311,240 @@ def start_server(patience: float=10, timestep: float=0.25):
 
     # Failed startup — dump logs for debugging
     print("\n❌ Translation server failed to start. Logs:")
-    try:
-        print(_translation_process.stdout.read().decode())
-        print(_translation_process.stderr.read().decode())
-    except Exception:
-        pass
+    for port in ports:
+        process = processes[port]
+        try:
+            os.killpg(process.pid, signal.SIGTERM)
+        except ProcessLookupError:
+            pass
+        try:
+            if process.stdout is None:
+                print(get_log_path(port).read_text())
+            else:
+                print(process.stdout.read().decode())
+                print(process.stderr.read().decode())
+        except Exception:
+            pass
 
     print("Failed to start translation server.")
     sys.exit(1)
 
 
 def kill_server():
-    """Kill the server and all children properly."""
-    global _translation_process
-    if _translation_process is None:
-        return
+    """Kill the server workers we started and all children properly.
+    Daemon workers are left running, see `stop_daemon`.
+    """
+    with _start_lock:
+        for port, process in list(_translation_processes.items()):
+            # Kill process group
+            try:
+                os.killpg(os.getpgid(process.pid), signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+            try:
+                process.wait(timeout=5)
+            except subprocess.TimeoutExpired:
+                process.kill()
+            del _translation_processes[port]
+
+
+@contextmanager
+def acquire_worker():
+    """Yield the port of the least busy worker, counting the requests
+    it is processing until we are done with it.
+    """
+    start_server()
+    with _pool_lock:
+        port = min(_server_ports, key=lambda p: _pending_requests.get(p, 0))
+        _pending_requests[port] = _pending_requests.get(port, 0) + 1
+    try:
+        yield port
+    finally:
+        with _pool_lock:
+            _pending_requests[port] -= 1
+
+
+# ------------------------------
+# Daemon Management
+# ------------------------------
+
+def get_daemon_dir():
+    daemon_dir = Path.home() / ".nora" / "translation_server"
+    daemon_dir.mkdir(parents=True, exist_ok=True)
+    return daemon_dir
+
+
+def get_pidfile_path():
+    return get_daemon_dir() / PIDFILE
+
+
+def get_log_path(port: int):
+    return get_daemon_dir() / f"{port}.log"
+
+
+@contextmanager
+def pidfile_lock():
+    """Hold an exclusive lock on ~/.nora/translation_server/, so that
+    concurrent NoRA commands do not start or stop the daemon at the
+    same time.
+    """
+    with open(get_daemon_dir() / LOCKFILE, 'w') as f:
+        fcntl.flock(f, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(f, fcntl.LOCK_UN)
+
 
-    # Kill process group
+def read_pidfile() -> Dict[int, int]:
+    """Return the PIDs of the daemon workers, by port. Empty if the
+    daemon is not running.
+    """
+    try:
+        with open(get_pidfile_path(), 'r') as f:
+            pids = json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {}
+    return {int(port): pid for port, pid in pids.items()}
+
+
+def write_pidfile(pids: Dict[int, int]):
+    path = get_pidfile_path()
+    tmp_path = path.with_suffix('.tmp')
+    with open(tmp_path, 'w') as f:
+        json.dump({str(port): pid for port, pid in pids.items()}, f)
+    os.replace(tmp_path, path)
+
+
+def is_pid_alive(pid: int):
     try:
-        os.killpg(os.getpgid(_translation_process.pid), signal.SIGTERM)
+        os.kill(pid, 0)
     except ProcessLookupError:
-        pass
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def is_daemon_worker(pid: int):
+    """Whether the process is a translation server worker, rather than
+    an unrelated process which reused the PID of a dead worker, eg after
+    a reboot.
+    """
+    try:
+        command = subprocess.check_output(
+            ['ps', '-o', 'command=', '-p', str(pid)],
+            stderr=subprocess.DEVNULL).decode()
+    except (subprocess.CalledProcessError, OSError):
+        return False
+    return 'node' in command and 'src/server.js' in command
+
+
+def is_worker_alive(port: int, pid: int):
+    """Whether a daemon worker is alive. Checking the port too catches
+    workers which died but were not reaped yet. This is cheap enough to
+    run before requests, unlike `is_daemon_worker`.
+    """
+    return is_pid_alive(pid) and is_port_open(port)
 
-    # Cleanup lingering socket holders
-    kill_pid_using_port(SERVER_PORT)
-    _translation_process = None
 
+def is_worker_verified(port: int, pid: int):
+    """Whether a daemon worker is alive and still runs the translation
+    server. Used when starting, stopping or inspecting the daemon.
+    """
+    return is_worker_alive(port, pid) and is_daemon_worker(pid)
 
-def kill_pid_using_port(port: Union[str, int], patience: float=5, timestep: float=0.1):
-    pid = get_pid_using_port(port)
-    if pid is None or pid <= 0:
-        return  # nothing to kill
 
+def signal_worker(pid: int, sig: int):
+    """Send a signal to a daemon worker and its children. Each worker
+    leads its own process group, which also holds its children.
+    """
     try:
-        os.kill(pid, signal.SIGTERM)
+        if os.getpgid(pid) == pid:
+            os.killpg(pid, sig)
+        else:
+            os.kill(pid, sig)
     except ProcessLookupError:
-        return
+        pass
 
-    start = time.time()
-    while True:
-        pid = get_pid_using_port(port)
-        if pid is None or pid <= 0 or time.time() - start > patience:
-            break
-        time.sleep(timestep)
+
+def start_daemon(patience: float=30, timestep: float=0.25):
+    """Start the translation server workers as a detached daemon, which
+    keeps running across NoRA commands until `stop_daemon`. Their PIDs
+    are saved in ~/.nora/translation_server/.
+    """
+    with pidfile_lock():
+        pids = read_pidfile()
+        alive = [
+            p for p, pid in pids.items() if is_worker_verified(p, pid)]
+        if len(alive) > 0:
+            print(
+                f"ℹ️ Translation server daemon already running on ports "
+                f"{', '.join(str(p) for p in sorted(alive))}.")
+            return
+
+        # The PIDs are stale, eg after a reboot
+        get_pidfile_path().unlink(missing_ok=True)
+
+        busy = [p for p in _server_ports if is_port_open(p)]
+        if len(busy) > 0:
+            print(
+                f"❌ Ports {', '.join(str(p) for p in busy)} are already "
+                f"in use. Stop the process using them or change "
+                f"`translation_server.port` in your config.")
+            sys.exit(1)
+
+        # Check that the node version is at most 20
+        check_node_version()
+
+        processes = {
+            port: start_worker(port, detach=True) for port in _server_ports}
+        wait_for_workers(processes, patience=patience, timestep=timestep)
+        write_pidfile({port: x.pid for port, x in processes.items()})
+
+
+def stop_daemon(patience: float=5, timestep: float=0.1):
+    """Stop the translation server daemon, if running. Only processes
+    which are still our workers are signalled, stale PIDs are dropped.
+    """
+    with pidfile_lock():
+        pids = [
+            pid for pid in read_pidfile().values()
+            if is_pid_alive(pid) and is_daemon_worker(pid)]
+        get_pidfile_path().unlink(missing_ok=True)
+        if len(pids) == 0:
+            print("ℹ️ No translation server daemon running.")
+            return
+
+        for pid in pids:
+            signal_worker(pid, signal.SIGTERM)
+
+        start = time.time()
+        while any(is_pid_alive(pid) and is_daemon_worker(pid)
+                  for pid in pids):
+            if time.time() - start > patience:
+                for pid in pids:
+                    if is_daemon_worker(pid):
+                        signal_worker(pid, signal.SIGKILL)
+                break
+            time.sleep(timestep)
+
+        print("✅ Translation server daemon stopped.")
+
+
+def daemon_status() -> Dict[int, str]:
+    """Return the status of each daemon worker, by port: 'running',
+    'unresponsive' or 'dead'. Empty if the daemon is not running.
+    """
+    status = {}
+    for port, pid in sorted(read_pidfile().items()):
+        if not is_worker_verified(port, pid):
+            status[port] = 'dead'
+        elif ping_server(port=port):
+            status[port] = 'running'
+        else:
+            status[port] = 'unresponsive'
+    return status
 
 
 def safe_kill_server():
@@ -185,20 +574,19 @@ def json_to_python(data: Union[str, List, Dict]):
         pass
 
     if isinstance(data, str):
-        print(f"❌ The translation server returned an error message:\n{data}")
-        sys.exit(1)
+        raise TranslationError(
+            f"❌ The translation server returned an error message:\n{data}")
 
     if isinstance(data, list):
-        if isinstance(data[0], dict):
+        if len(data) > 0 and isinstance(data[0], dict):
             data = data[0]
         else:
-            print(
-                f"❌ Expected a List(Dict), but received a "
-                f"List({type(data[0])}):\n{data}")
-            sys.exit(1)
+            raise TranslationError(
+                f"❌ Expected a List(Dict), but received:\n{data}")
     elif not isinstance(data, dict):
-        print(f"❌ Expected a Dict or a List(Dict), got a {type(data)}:\n{data}")
-        sys.exit(1)
+        raise TranslationError(
+            f"❌ Expected a Dict or a List(Dict), got a "
+            f"{type(data)}:\n{data}")
 
     if 'data' not in data:
         data['data'] = {**data}
@@ -208,30 +596,114 @@ def json_to_python(data: Union[str, List, Dict]):
     return data
 
 
-def translate_from_url(url: str, timeout: float=20):
-    start_server()
-    print(f"ℹ️ Retrieving metadata for URL: {url} ...")
-    try:
-        out = subprocess.check_output([
-            'curl', '-s', '-S', '-d', url, '-m', f'{timeout}', '-H', "Content-Type: text/plain", f"{SERVER_IP}/web"
-        ])
-    except subprocess.CalledProcessError:
-        print("❌ Failed to contact the translation server. Please check your internet connection or try again.")
-        sys.exit(1)
-    return json_to_python(out)
+def _translate(endpoint: str, query: str, timeout: float=20):
+    """Send a query to a translation server endpoint and return the
+    parsed metadata. Raise a TranslationError if this fails.
+    """
+    response = None
+    for attempt in range(2):
+        with acquire_worker() as port:
+            try:
+                response = get_client().post(
+                    f"{get_server_url(port)}/{endpoint}",
+                    data=query.encode('utf-8'),
+                    headers={'Content-Type': 'text/plain'},
+                    timeout=timeout)
+                break
+            except requests.ConnectionError:
+                # The worker may have died, in which case it is
+                # restarted when acquiring a worker again
+                forget_worker_check()
+                continue
+            except requests.RequestException:
+                break
+
+    if response is None:
+        raise TranslationError(
+            "❌ Failed to contact the translation server. Please check "
+            "your internet connection or try again.")
+
+    # 300 means several items were found, the server then returns the
+    # list of choices rather than metadata. See:
+    # https://github.com/zotero/translation-server#user-content-web-translation
+    if response.status_code == 300:
+        raise TranslationError(
+            f"❌ Multiple items found for '{query}', please provide a "
+            f"more specific query.")
+    if response.status_code == 501:
+        raise TranslationError(f"❌ No translator available for '{query}'.")
+    if not response.ok:
+        raise TranslationError(
+            f"❌ The translation server returned an error "
+            f"({response.status_code}):\n{response.text}")
+
+    return json_to_python(response.content)
+
+
+def _cached_translate(
+        endpoint: str,
+        query: str,
+        timeout: float=20,
+        refresh: bool=False):
+    """Return the cached metadata for the query if any, translate it
+    otherwise. `refresh` bypasses the cache lookup, the fresh result
+    still replaces the cached one.
+    """
+    cache = get_cache()
+    if cache is not None and not refresh:
+        data = cache.get(endpoint, query)
+        if data is not None:
+            print(f"✅ Metadata retrieved from cache for: {query}")
+            return data
+
+    kind = 'URL' if endpoint == 'web' else 'identifier'
+    print(f"ℹ️ Retrieving metadata for {kind}: {query} ...")
+    data = _translate(endpoint, query, timeout=timeout)
+
+    if cache is not None:
+        cache.set(endpoint, query, data)
+    return data
 
 
-def translate_from_identifier(identifier: str, timeout: float=20):
-    start_server()
-    print(f"ℹ️ Retrieving metadata for identifier: {identifier} ...")
+def _translate_or_exit(endpoint: str, query: str, **kwargs):
     try:
-        out = subprocess.check_output([
-            'curl', '-s', '-S', '-d', identifier, '-m', f'{timeout}', '-H', "Content-Type: text/plain", f"{SERVER_IP}/search"
-        ])
-    except subprocess.CalledProcessError:
-        print("❌ Failed to contact the translation server. Please check your internet connection or try again.")
+        return _cached_translate(endpoint, query, **kwargs)
+    except TranslationError as e:
+        print(e)
         sys.exit(1)
-    return json_to_python(out)
+
+
+def translate_from_url(url: str, timeout: float=20, refresh: bool=False):
+    return _translate_or_exit('web', url, timeout=timeout, refresh=refresh)
+
+
+def translate_from_urls(
+        urls: List[str],
+        timeout: float=20,
+        refresh: bool=False):
+    """Translate several URLs in parallel, one at a time per worker.
+    Results are returned in the order of `urls`. URLs which could not
+    be translated are reported and their result is None, without
+    interrupting the others.
+    """
+    def translate(url):
+        try:
+            return _cached_translate(
+                'web', url, timeout=timeout, refresh=refresh)
+        except TranslationError as e:
+            print(f"{e}\n⚠️ Skipping '{url}'")
+            return None
+
+    with ThreadPoolExecutor(max_workers=len(_server_ports)) as executor:
+        return list(executor.map(translate, urls))
+
+
+def translate_from_identifier(
+        identifier: str,
+        timeout: float=20,
+        refresh: bool=False):
+    return _translate_or_exit(
+        'search', identifier, timeout=timeout, refresh=refresh)
 
 
 def check_node_version():
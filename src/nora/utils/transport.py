@@ -0,0 +1,249 @@
+import time
+import random
+import requests
+import threading
+from requests.adapters import HTTPAdapter
+from urllib3.exceptions import ConnectTimeoutError
+
+
+__all__ = ['RateLimiter', 'Transport', 'get_notion_transport']
+
+
+# HTTP status codes worth retrying: rate limiting and transient server
+# errors
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+# Methods which may safely be sent twice. Other methods, eg creating a
+# Notion page with a POST, are only retried when the server cannot
+# have processed the request, see `Transport.request`
+IDEMPOTENT_METHODS = {'GET', 'HEAD', 'OPTIONS', 'PUT', 'DELETE'}
+
+
+class RateLimiter:
+
+    """Thread-safe token bucket. Tokens are refilled at `rate` per
+    second, up to `burst` tokens. Each request consumes one token,
+    waiting for it if necessary.
+
+    The limiter may also be paused, eg when the server asks us to back
+    off with a `Retry-After` header. In the meantime, all requests
+    sharing the limiter wait.
+
+    :param rate: float
+        Sustained number of requests per second
+    :param burst: int
+        Maximum number of requests that may be sent at once. Defaults
+        to `rate`
+    """
+
+    def __init__(self, rate: float=3, burst: int=None):
+        self.rate = rate
+        self.burst = max(1, int(rate)) if burst is None else burst
+        self._tokens = self.burst
+        self._updated = time.monotonic()
+        self._paused_until = 0
+        self._lock = threading.Lock()
+
+    def _refill(self, now: float):
+        elapsed = now - self._updated
+        self._tokens = min(self.burst, self._tokens + elapsed * self.rate)
+        self._updated = now
+
+    def _wait_time(self, now: float):
+        if now < self._paused_until:
+            return self._paused_until - now
+        if self._tokens >= 1:
+            return 0
+        return (1 - self._tokens) / self.rate
+
+    @property
+    def wait_time(self):
+        """Number of seconds a request issued now would have to wait.
+        """
+        with self._lock:
+            now = time.monotonic()
+            self._refill(now)
+            return self._wait_time(now)
+
+    def acquire(self):
+        """Block until a request may be sent.
+        """
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._refill(now)
+                wait = self._wait_time(now)
+                if wait <= 0:
+                    self._tokens -= 1
+                    return
+            time.sleep(wait)
+
+    def pause(self, seconds: float):
+        """Hold all requests for the given number of seconds.
+        """
+        with self._lock:
+            now = time.monotonic()
+            self._paused_until = max(self._paused_until, now + seconds)
+            self._tokens = 0
+            self._updated = now
+
+    def __repr__(self):
+        return (
+            f"{self.__class__.__name__}(rate={self.rate}, "
+            f"burst={self.burst})")
+
+
+class Transport:
+
+    """Long-lived HTTP transport. Wraps a `requests.Session` whose
+    connections are kept alive and pooled, so consecutive requests to
+    the same host do not pay for a new TCP/TLS handshake each time.
+
+    :param pool_size: int
+        Maximum number of connections kept alive per host
+    :param timeout: float
+        Default timeout, in seconds, for each request
+    :param rate_limiter: RateLimiter
+        Optional rate limiter throttling the requests
+    :param max_retries: int
+        Number of times a request is retried after a connection error,
+        a timeout, a 429 or a 5xx response. The `Retry-After` header is
+        honored when present, otherwise we back off exponentially.
+        Non-idempotent requests are only retried after a 429 or a
+        failure to connect, since they may otherwise have been
+        processed already
+    :param backoff: float
+        Base delay, in seconds, of the exponential backoff. All delays
+        are jittered to avoid retrying in lockstep
+    """
+
+    def __init__(
+            self,
+            pool_size: int=10,
+            timeout: float=30,
+            rate_limiter: RateLimiter=None,
+            max_retries: int=0,
+            backoff: float=1,
+            max_backoff: float=60):
+        self.pool_size = pool_size
+        self.timeout = timeout
+        self.rate_limiter = rate_limiter
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.session = requests.Session()
+        adapter = HTTPAdapter(
+            pool_connections=pool_size,
+            pool_maxsize=pool_size)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+
+    @property
+    def wait_time(self):
+        """Number of seconds a request issued now would have to wait
+        before being sent.
+        """
+        if self.rate_limiter is None:
+            return 0
+        return self.rate_limiter.wait_time
+
+    def _retry_delay(self, attempt: int, response=None):
+        delay = min(self.max_backoff, self.backoff * 2 ** attempt)
+        retry_after = None if response is None \
+            else response.headers.get('Retry-After')
+        try:
+            delay = float(retry_after)
+        except (TypeError, ValueError):
+            pass
+        return delay * (1 + random.uniform(0, 0.25))
+
+    def _wait(self, delay: float):
+        if self.rate_limiter is not None:
+            self.rate_limiter.pause(delay)
+        else:
+            time.sleep(delay)
+
+    @staticmethod
+    def _not_sent(error: requests.RequestException):
+        """Whether the request failed before reaching the server, eg
+        because the connection could not be established.
+        """
+        if isinstance(error, requests.ConnectTimeout):
+            return True
+        reason = getattr(error.args[0] if error.args else None, 'reason', None)
+        return isinstance(reason, ConnectTimeoutError)
+
+    def request(
+            self,
+            method: str,
+            url: str,
+            idempotent: bool=None,
+            **kwargs):
+        """Send a request, retrying it when this is safe. Set
+        `idempotent` for requests which do not modify anything despite
+        their method, eg POST queries of Notion databases.
+        """
+        kwargs.setdefault('timeout', self.timeout)
+        if idempotent is None:
+            idempotent = method.upper() in IDEMPOTENT_METHODS
+        for attempt in range(self.max_retries + 1):
+            if self.rate_limiter is not None:
+                self.rate_limiter.acquire()
+
+            try:
+                response = self.session.request(method, url, **kwargs)
+            except (requests.ConnectionError, requests.Timeout) as e:
+                if attempt == self.max_retries \
+                        or not (idempotent or self._not_sent(e)):
+                    raise
+                self._wait(self._retry_delay(attempt))
+                continue
+
+            retry = response.status_code in RETRY_STATUSES if idempotent \
+                else response.status_code == 429
+            if not retry or attempt == self.max_retries:
+                return response
+            self._wait(self._retry_delay(attempt, response))
+
+    def get(self, url: str, **kwargs):
+        return self.request('GET', url, **kwargs)
+
+    def post(self, url: str, **kwargs):
+        return self.request('POST', url, **kwargs)
+
+    def patch(self, url: str, **kwargs):
+        return self.request('PATCH', url, **kwargs)
+
+    def close(self):
+        self.session.close()
+
+    def __repr__(self):
+        return (
+            f"{self.__class__.__name__}(pool_size={self.pool_size}, "
+            f"timeout={self.timeout})")
+
+
+# Transport shared by all NotionLibrary instances of the process
+_notion_transport = None
+
+
+def get_notion_transport(
+        pool_size: int=10,
+        timeout: float=30,
+        rate_limit: float=3,
+        max_retries: int=5):
+    """Return the process-wide transport used for Notion API calls.
+    The transport is created on the first call, subsequent calls return
+    the same object regardless of their arguments.
+
+    Notion allows an average of 3 requests per second per integration,
+    see: https://developers.notion.com/reference/request-limits
+    """
+    global _notion_transport
+    if _notion_transport is None:
+        _notion_transport = Transport(
+            pool_size=pool_size,
+            timeout=timeout,
+            rate_limiter=RateLimiter(rate=rate_limit),
+            max_retries=max_retries)
+    return _notion_transport
@@ -1,56 +1,194 @@
 import re
-from typing import Union, Dict, Optional
+from typing import Union, Dict, List, Optional
 from omegaconf import OmegaConf
 from rapidfuzz import process, fuzz
 
 
-def parse_venue(
-    text: str,
-    venues_dict: Union[OmegaConf, Dict],
-    fuzzy_threshold: int = 85
-) -> Optional[str]:
-    """Given a venue string, try to find if an acronym is available in
-    the config file.
+__all__ = ['VenueMatcher', 'get_venue_matcher', 'parse_venue']
+
+
+class VenueMatcher:
+
+    """Match venue strings against the venue-acronym pairs of the config
+    file. All the venue keys and acronyms are compiled once into a
+    single regular expression, and results are memoized per input text.
 
     Priority:
         1. Exact matches of full-text keys (longer first)
         2. Exact matches of acronyms (longer first)
         3. Fuzzy fallback if nothing matches
+
+    :param venues_dict: OmegaConf or Dict
+        Mapping of venue full-text keys to acronyms
+    :param fuzzy_threshold: int
+        Minimum fuzzy matching score for the fallback
+    :param memo_size: int
+        Maximum number of memoized texts
     """
-    if text is None:
+
+    def __init__(
+            self,
+            venues_dict: Union[OmegaConf, Dict],
+            fuzzy_threshold: int = 85,
+            memo_size: int = 100000):
+        if OmegaConf.is_config(venues_dict):
+            venues_dict = OmegaConf.to_container(venues_dict, resolve=True)
+        self.venues = dict(venues_dict)
+        self.fuzzy_threshold = fuzzy_threshold
+        self.memo_size = memo_size
+        self._memo = {}
+
+        # Sort keys by length (descending)
+        sorted_keys = sorted(self.venues.keys(), key=len, reverse=True)
+        sorted_acronyms = sorted(
+            set(self.venues.values()), key=len, reverse=True)
+
+        # Map each normalized pattern to its result. Patterns are
+        # inserted by decreasing priority, so the first one wins if a
+        # key and an acronym happen to coincide
+        self._results = {}
+        for key in sorted_keys + sorted_acronyms:
+            self._results.setdefault(key.lower(), self.venues.get(key, key))
+        self._priority = {k: i for i, k in enumerate(self._results)}
+
+        # Single alternation of all patterns, by decreasing priority.
+        # The lookahead lets us see every position where a pattern
+        # starts, including overlapping ones, and at each position the
+        # highest-priority pattern is reported
+        self._regex = None
+        if len(self._results) > 0:
+            alternation = '|'.join(re.escape(k) for k in self._results)
+            self._regex = re.compile(r'(?=\b(' + alternation + r')\b)')
+
+        # Fuzzy matching candidates
+        self.candidates = \
+            list(self.venues.keys()) + list(self.venues.values())
+
+    def match_exact(self, text_norm: str) -> Optional[str]:
+        """Search the highest-priority key or acronym appearing in an
+        already-lowercased text.
+        """
+        if self._regex is None:
+            return None
+        best = None
+        for match in self._regex.finditer(text_norm):
+            key = match.group(1)
+            if best is None or self._priority[key] < self._priority[best]:
+                best = key
+                if self._priority[best] == 0:
+                    break
+        return None if best is None else self._results[best]
+
+    def match_fuzzy(self, text_norm: str) -> Optional[str]:
+        if len(self.candidates) == 0:
+            return None
+        best, score, _ = process.extractOne(
+            text_norm,
+            self.candidates,
+            scorer=fuzz.partial_ratio)
+        return self._fuzzy_result(best, score)
+
+    def _fuzzy_result(self, best: str, score: float) -> Optional[str]:
+        if best is not None and score >= self.fuzzy_threshold:
+            if best in self.venues:
+                return self.venues[best]
+            else:
+                return best  # It was an acronym
         return None
 
-    if isinstance(venues_dict, OmegaConf):
-        venues_dict = OmegaConf.to_container(venues_dict, resolve=True)
-
-    # Normalize input text
-    text_norm = text.lower()
-
-    # Sort keys by length (descending)
-    sorted_keys = sorted(venues_dict.keys(), key=len, reverse=True)
-    sorted_acronyms = sorted(set(venues_dict.values()), key=len, reverse=True)
-    sorted_keys = sorted_keys + sorted_acronyms
-
-    # Exact (regex) matching
-    for key in sorted_keys:
-        key_norm = key.lower()
-        pattern = r'\b' + re.escape(key_norm) + r'\b'
-        if re.search(pattern, text_norm):
-            if key in venues_dict:
-                return venues_dict[key]
-            return key
-
-    # Fuzzy matching fallback
-    candidates = list(venues_dict.keys()) + list(venues_dict.values())
-    best, score, _ = process.extractOne(
-        text_norm,
-        candidates,
-        scorer=fuzz.partial_ratio)
-    if best is not None and score >= fuzzy_threshold:
-        if best in venues_dict:
-            return venues_dict[best]
+    def match_many(
+            self,
+            texts: List[str],
+            workers: int = -1) -> List[Optional[str]]:
+        """Resolve many texts at once. Exact matching runs text by text,
+        but the fuzzy fallback of all texts without an exact match is
+        scored in a single `process.cdist` call, spread over `workers`
+        cores (all cores by default). Results are memoized, so later
+        calls on the same texts are free.
+        """
+        results = {}
+        pending = []
+        for text in dict.fromkeys(t for t in texts if t is not None):
+            if text in self._memo:
+                results[text] = self._memo[text]
+                continue
+            venue = self.match_exact(text.lower())
+            if venue is not None:
+                results[text] = venue
+            else:
+                pending.append(text)
+
+        if len(pending) > 0 and len(self.candidates) > 0:
+            scores = process.cdist(
+                [text.lower() for text in pending],
+                self.candidates,
+                scorer=fuzz.partial_ratio,
+                workers=workers)
+            for text, row in zip(pending, scores):
+                j = int(row.argmax())
+                results[text] = self._fuzzy_result(self.candidates[j], row[j])
         else:
-            return best  # It was an acronym
+            results.update({text: None for text in pending})
+
+        if len(self._memo) + len(results) > self.memo_size:
+            self._memo.clear()
+        self._memo.update(results)
+
+        return [results.get(text) for text in texts]
+
+    def __call__(self, text: str) -> Optional[str]:
+        if text is None:
+            return None
 
-    # No match found
-    return None
+        if text in self._memo:
+            return self._memo[text]
+
+        # Normalize input text
+        text_norm = text.lower()
+
+        venue = self.match_exact(text_norm)
+        if venue is None:
+            venue = self.match_fuzzy(text_norm)
+
+        if len(self._memo) >= self.memo_size:
+            self._memo.clear()
+        self._memo[text] = venue
+
+        return venue
+
+    def __len__(self):
+        return len(self.venues)
+
+    def __repr__(self):
+        return f"{self.__class__.__name__}({len(self)})"
+
+
+def get_venue_matcher(
+        venues: Union[OmegaConf, Dict, VenueMatcher],
+        fuzzy_threshold: int = 85) -> Optional[VenueMatcher]:
+    """Return `venues` if already a VenueMatcher, build one otherwise.
+    """
+    if venues is None or isinstance(venues, VenueMatcher):
+        return venues
+    return VenueMatcher(venues, fuzzy_threshold=fuzzy_threshold)
+
+
+def parse_venue(
+    text: str,
+    venues_dict: Union[OmegaConf, Dict, VenueMatcher],
+    fuzzy_threshold: int = 85
+) -> Optional[str]:
+    """Given a venue string, try to find if an acronym is available in
+    the config file. See `VenueMatcher`.
+
+    Building a VenueMatcher is the costly part, so repeated calls
+    should rather pass a VenueMatcher built once. In which case
+    `fuzzy_threshold` is ignored.
+    """
+    if text is None:
+        return None
+
+    matcher = get_venue_matcher(venues_dict, fuzzy_threshold)
+    if matcher is None:
+        return None
+    return matcher(text)
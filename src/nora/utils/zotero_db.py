@@ -0,0 +1,234 @@
+import re
+import sys
+import shutil
+import sqlite3
+import tempfile
+from pathlib import Path
+
+
+__all__ = ['ZoteroDatabase']
+
+
+# Default location of the database of the Zotero desktop client
+ZOTERO_DB = Path.home() / "Zotero" / "zotero.sqlite"
+
+# Item types which are children of other items, rather than top-level
+# items, when they have a parent
+CHILD_TYPES = ['note', 'attachment', 'annotation']
+
+
+def _to_api_date(date: str) -> str:
+    """Convert a 'YYYY-MM-DD HH:MM:SS' UTC date from the database to
+    the ISO format of the Zotero API.
+    """
+    return date.replace(' ', 'T') + 'Z' if date else date
+
+
+def _to_api_value(field: str, value: str) -> str:
+    """Dates are stored as 'YYYY-MM-DD original text', where the first
+    part is a sortable version of the date as typed by the user. The
+    API only returns the original text.
+    """
+    if field == 'date' and re.match(r'^\d{4}-\d{2}-\d{2} ', value):
+        return value[11:]
+    return value
+
+
+class ZoteroDatabase:
+
+    """Reader of the local database of the Zotero desktop client,
+    typically ~/Zotero/zotero.sqlite. Items, collections and notes of
+    the user library are read in a handful of queries, and formatted
+    like the objects returned by the Zotero API.
+
+    Zotero locks its database while running, so the database is never
+    opened in place: it is copied to a temporary directory first, and
+    the copy is read.
+
+    :param path: str
+        Path to zotero.sqlite. Defaults to ~/Zotero/zotero.sqlite
+    """
+
+    def __init__(self, path: str=None):
+        self.path = ZOTERO_DB if path is None else Path(path).expanduser()
+        if not self.path.exists():
+            print(
+                f"❌ Could not find the Zotero database '{self.path}'. "
+                f"Please check `zotero.database` in your config.")
+            sys.exit(1)
+        self.items = []
+        self.collections = []
+        self.notes = []
+        self.load()
+
+    def load(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            # Copy the journal files too, if any, so that SQLite can
+            # recover a consistent state from a copy taken mid-write
+            copy = Path(tmp_dir) / self.path.name
+            for suffix in ['', '-journal', '-wal']:
+                source = self.path.with_name(self.path.name + suffix)
+                if source.exists():
+                    shutil.copyfile(
+                        source, copy.with_name(copy.name + suffix))
+
+            connection = sqlite3.connect(str(copy))
+            try:
+                self._read(connection)
+            finally:
+                connection.close()
+
+    @staticmethod
+    def _table(connection: sqlite3.Connection, *names: str) -> str:
+        """Return the first of the tables or views which exists. Recent
+        Zotero versions expose custom fields and types through
+        '*Combined' views.
+        """
+        for name in names:
+            row = connection.execute(
+                "SELECT 1 FROM sqlite_master WHERE name = ?",
+                (name,)).fetchone()
+            if row is not None:
+                return name
+        return None
+
+    def _read(self, connection: sqlite3.Connection):
+        types_table = self._table(
+            connection, 'itemTypesCombined', 'itemTypes')
+        fields_table = self._table(connection, 'fieldsCombined', 'fields')
+
+        library_id = connection.execute(
+            "SELECT libraryID FROM libraries WHERE type = 'user'"
+        ).fetchone()[0]
+
+        rows = connection.execute(
+            f"SELECT i.itemID, t.typeName, i.key, i.version, i.dateAdded, "
+            f"i.dateModified FROM items i JOIN {types_table} t "
+            f"USING (itemTypeID) WHERE i.libraryID = ? AND i.itemID NOT IN "
+            f"(SELECT itemID FROM deletedItems)",
+            (library_id,)).fetchall()
+        items = {}
+        for item_id, item_type, key, version, added, modified in rows:
+            items[item_id] = {
+                'key': key,
+                'version': version,
+                'meta': {'numChildren': 0},
+                'data': {
+                    'key': key,
+                    'version': version,
+                    'itemType': item_type,
+                    'creators': [],
+                    'tags': [],
+                    'collections': [],
+                    'relations': {},
+                    'dateAdded': _to_api_date(added),
+                    'dateModified': _to_api_date(modified)}}
+
+        # The API returns all the fields of an item type, empty ones
+        # included, while the database only stores the non-empty ones
+        type_fields_table = self._table(
+            connection, 'itemTypeFieldsCombined', 'itemTypeFields')
+        if type_fields_table is not None:
+            rows = connection.execute(
+                f"SELECT t.typeName, f.fieldName FROM {type_fields_table} "
+                f"JOIN {types_table} t USING (itemTypeID) "
+                f"JOIN {fields_table} f USING (fieldID)").fetchall()
+            type_fields = {}
+            for item_type, field in rows:
+                type_fields.setdefault(item_type, []).append(field)
+            for item in items.values():
+                for field in type_fields.get(item['data']['itemType'], []):
+                    item['data'][field] = ''
+
+        rows = connection.execute(
+            f"SELECT d.itemID, f.fieldName, v.value FROM itemData d "
+            f"JOIN itemDataValues v USING (valueID) "
+            f"JOIN {fields_table} f USING (fieldID)").fetchall()
+        for item_id, field, value in rows:
+            if item_id in items:
+                items[item_id]['data'][field] = _to_api_value(field, value)
+
+        rows = connection.execute(
+            "SELECT ic.itemID, ct.creatorType, c.firstName, c.lastName, "
+            "c.fieldMode FROM itemCreators ic "
+            "JOIN creators c USING (creatorID) "
+            "JOIN creatorTypes ct USING (creatorTypeID) "
+            "ORDER BY ic.itemID, ic.orderIndex").fetchall()
+        for item_id, creator_type, first_name, last_name, mode in rows:
+            if item_id not in items:
+                continue
+            # Single-field creators, eg institutions, only have a name
+            if mode == 1:
+                creator = {'creatorType': creator_type, 'name': last_name}
+            else:
+                creator = {
+                    'creatorType': creator_type,
+                    'firstName': first_name,
+                    'lastName': last_name}
+            items[item_id]['data']['creators'].append(creator)
+
+        rows = connection.execute(
+            "SELECT it.itemID, t.name, it.type FROM itemTags it "
+            "JOIN tags t USING (tagID)").fetchall()
+        for item_id, name, tag_type in rows:
+            if item_id in items:
+                tag = {'tag': name, 'type': 1} if tag_type == 1 \
+                    else {'tag': name}
+                items[item_id]['data']['tags'].append(tag)
+
+        rows = connection.execute(
+            "SELECT ci.itemID, c.key FROM collectionItems ci "
+            "JOIN collections c USING (collectionID)").fetchall()
+        for item_id, collection_key in rows:
+            if item_id in items:
+                items[item_id]['data']['collections'].append(collection_key)
+
+        # Child notes, attachments and annotations, by item
+        parents = {}
+        rows = connection.execute(
+            "SELECT itemID, parentItemID, note FROM itemNotes").fetchall()
+        for item_id, parent_id, note in rows:
+            if item_id in items:
+                items[item_id]['data']['note'] = note or ''
+                parents[item_id] = parent_id
+        for table in ['itemAttachments', 'itemAnnotations']:
+            if self._table(connection, table) is None:
+                continue
+            rows = connection.execute(
+                f"SELECT itemID, parentItemID FROM {table}").fetchall()
+            parents.update(rows)
+
+        self.items = []
+        self.notes = []
+        for item_id, item in items.items():
+            parent = items.get(parents.get(item_id))
+            if item['data']['itemType'] in CHILD_TYPES and parent is not None:
+                item['data']['parentItem'] = parent['key']
+                if item['data']['itemType'] != 'annotation':
+                    parent['meta']['numChildren'] += 1
+                if item['data']['itemType'] == 'note':
+                    self.notes.append(item)
+                continue
+            self.items.append(item)
+
+        rows = connection.execute(
+            "SELECT collectionID, key, version, collectionName, "
+            "parentCollectionID FROM collections WHERE libraryID = ?",
+            (library_id,)).fetchall()
+        keys = {row[0]: row[1] for row in rows}
+        self.collections = []
+        for collection_id, key, version, name, parent_id in rows:
+            self.collections.append({
+                'key': key,
+                'version': version,
+                'data': {
+                    'key': key,
+                    'version': version,
+                    'name': name,
+                    'parentCollection': keys.get(parent_id, False)}})
+
+    def __len__(self):
+        return len(self.items)
+
+    def __repr__(self):
+        return f"{self.__class__.__name__}({self.path}, {len(self)})"